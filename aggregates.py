@@ -0,0 +1,290 @@
+"""
+Aggregates - Frozen per-(week, game) quester aggregates for Phase 1/2
+
+A complete week stops changing once late events and sybil score updates
+have landed (store.SETTLE_DAYS after it ends). It is then scanned once more
+(weekly_aggregates.sql), frozen as a Parquet partition and reused by every
+later decomposition or trend request. Newer complete weeks are stored too
+but rescanned when their partition is older than store.UNSETTLED_MAX_AGE.
+Only weeks missing or not current in the store touch BigQuery.
+"""
+import datetime
+import json
+import threading
+
+import pyarrow as pa
+
+import store
+from resources import WEEKLY_AGGREGATES_SQL
+from tools import run_query
+
+TABLE = "weekly_aggregates"
+
+SCHEMA = pa.schema([
+    ("week_start", pa.string()),
+    ("game_name", pa.string()),  # NULL on the overall (distinct across games) row
+    ("tier", pa.string()),
+    ("am", pa.string()),
+    ("total_users", pa.int64()),
+    ("human_users", pa.int64()),
+    ("bot_users", pa.int64()),
+    ("quest_count", pa.int64()),
+])
+
+BUCKET_ORDER = {"New": 1, "Discontinued": 2, "Continuing": 3, "Unknown": 4}
+
+_ensure_lock = threading.Lock()
+
+
+def week_start(day: datetime.date) -> datetime.date:
+    """Monday of the week containing `day` (weeks run Monday-Sunday UTC)"""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def parse_week(value: str) -> datetime.date:
+    """Parse YYYY-MM-DD and snap it to the Monday of its week"""
+    return week_start(datetime.date.fromisoformat(value))
+
+
+def complete_weeks(n: int, today: datetime.date = None) -> list:
+    """Last `n` complete weeks, most recent first (excludes the current week)"""
+    current = week_start(today or datetime.datetime.utcnow().date())
+    return [current - datetime.timedelta(weeks=i) for i in range(1, n + 1)]
+
+
+def _is_current(week: datetime.date) -> bool:
+    """Whether a week's stored aggregates can be reused (see store.is_current)"""
+    return store.is_current(TABLE, week.isoformat(), week + datetime.timedelta(weeks=1))
+
+
+def ensure_weeks(weeks: list, caller: str = None) -> list:
+    """
+    Make sure every week is current in the store, scanning only the weeks
+    missing or not yet settled (see store.is_current).
+
+    Returns the weeks that had to be scanned.
+    """
+    current = week_start(datetime.datetime.utcnow().date())
+    for week in weeks:
+        if week >= current:
+            raise ValueError(f"Week {week.isoformat()} is not complete yet; only complete weeks are stored")
+
+    if all(_is_current(w) for w in weeks):
+        return []
+
+    # One scanner at a time, so concurrent callers don't both scan the same missing week
+    with _ensure_lock:
+        missing = sorted(w for w in set(weeks) if not _is_current(w))
+        for start, end in store.contiguous_runs(missing, datetime.timedelta(weeks=1)):
+            rows = run_query(WEEKLY_AGGREGATES_SQL, {"start_date": start, "end_date": end},
+                             caller=caller or "aggregates")
+
+            by_week = {}
+            week = start
+            while week < end:
+                by_week[week.isoformat()] = []
+                week += datetime.timedelta(weeks=1)
+            for row in rows:
+                by_week[row["week_start"]].append(row)
+
+            for key, week_rows in by_week.items():
+                store.write_partition(TABLE, key, week_rows, SCHEMA)
+    return missing
+
+
+def load_week(week: datetime.date) -> dict:
+    """Stored aggregates for one week: {"overall": row or None, "games": {game_name: row}}"""
+    overall = None
+    games = {}
+    for row in store.read_partition(TABLE, week.isoformat()):
+        if row["game_name"] is None:
+            overall = row
+        else:
+            games[row["game_name"]] = row
+    return {"overall": overall, "games": games}
+
+
+def _bot_pct(bots: int, total: int):
+    """Bot % rounded like the SQL (NULL when there are no users)"""
+    return round(100.0 * bots / total, 1) if total else None
+
+
+def _pct_change(curr: int, prev: int):
+    return round(100.0 * (curr - prev) / prev, 1) if prev else None
+
+
+def decompose(curr_week: datetime.date, prev_week: datetime.date, caller: str = None) -> dict:
+    """
+    Phase 2 decomposition (New / Discontinued / Continuing) between any two weeks.
+
+    Game rows mirror the columns of phase2_decomposition.sql.
+    """
+    ensure_weeks([curr_week, prev_week], caller)
+    curr = load_week(curr_week)
+    prev = load_week(prev_week)
+
+    game_rows = []
+    for game_name in set(curr["games"]) | set(prev["games"]):
+        c = curr["games"].get(game_name, {})
+        p = prev["games"].get(game_name, {})
+        curr_total = c.get("total_users", 0)
+        prev_total = p.get("total_users", 0)
+
+        if prev_total == 0 and curr_total > 0:
+            bucket = "New"
+        elif prev_total > 0 and curr_total == 0:
+            bucket = "Discontinued"
+        elif prev_total > 0 and curr_total > 0:
+            bucket = "Continuing"
+        else:
+            bucket = "Unknown"
+
+        game_rows.append({
+            "bucket": bucket,
+            "game_name": game_name,
+            "tier": c.get("tier") or p.get("tier"),
+            "am": c.get("am") or p.get("am"),
+            "prev_users": prev_total,
+            "prev_humans": p.get("human_users", 0),
+            "prev_bots": p.get("bot_users", 0),
+            "prev_bot_pct": _bot_pct(p.get("bot_users", 0), prev_total),
+            "prev_quests": p.get("quest_count", 0),
+            "curr_users": curr_total,
+            "curr_humans": c.get("human_users", 0),
+            "curr_bots": c.get("bot_users", 0),
+            "curr_bot_pct": _bot_pct(c.get("bot_users", 0), curr_total),
+            "curr_quests": c.get("quest_count", 0),
+            "delta_total": curr_total - prev_total,
+            "delta_humans": c.get("human_users", 0) - p.get("human_users", 0),
+            "delta_bots": c.get("bot_users", 0) - p.get("bot_users", 0),
+            "pct_change": _pct_change(curr_total, prev_total),
+        })
+    game_rows.sort(key=lambda r: (BUCKET_ORDER[r["bucket"]], -abs(r["delta_total"])))
+
+    buckets = {}
+    for row in game_rows:
+        summary = buckets.setdefault(row["bucket"], {"games": 0, "delta_total": 0, "delta_humans": 0, "delta_bots": 0})
+        summary["games"] += 1
+        summary["delta_total"] += row["delta_total"]
+        summary["delta_humans"] += row["delta_humans"]
+        summary["delta_bots"] += row["delta_bots"]
+
+    curr_overall = (curr["overall"] or {}).get("total_users", 0)
+    prev_overall = (prev["overall"] or {}).get("total_users", 0)
+    return {
+        "curr_week": curr_week.isoformat(),
+        "prev_week": prev_week.isoformat(),
+        "overall": {
+            "curr_questers": curr_overall,
+            "prev_questers": prev_overall,
+            "delta": curr_overall - prev_overall,
+            "pct_change": _pct_change(curr_overall, prev_overall),
+            "curr_bot_pct": _bot_pct((curr["overall"] or {}).get("bot_users", 0), curr_overall),
+            "prev_bot_pct": _bot_pct((prev["overall"] or {}).get("bot_users", 0), prev_overall),
+        },
+        "buckets": buckets,
+        "games": game_rows,
+        "note": "Per-game sums ≠ overall total due to multi-game users.",
+    }
+
+
+def trend_matrix(weeks: list, caller: str = None) -> dict:
+    """
+    N-week trend matrix: overall distinct questers per week plus per-game
+    questers, bot % and quests available, oldest week first.
+    """
+    weeks = sorted(weeks)
+    ensure_weeks(weeks, caller)
+    loaded = [load_week(week) for week in weeks]
+
+    overall = []
+    prev_total = None
+    for week, data in zip(weeks, loaded):
+        total = (data["overall"] or {}).get("total_users", 0)
+        overall.append({
+            "week_start": week.isoformat(),
+            "gameplay_questers": total,
+            "bot_pct": _bot_pct((data["overall"] or {}).get("bot_users", 0), total),
+            "wow_pct": _pct_change(total, prev_total) if prev_total is not None else None,
+        })
+        prev_total = total
+
+    game_names = set()
+    for data in loaded:
+        game_names.update(data["games"])
+
+    games = []
+    for game_name in game_names:
+        rows = [data["games"].get(game_name, {}) for data in loaded]
+        latest = next((row for row in reversed(rows) if row), {})
+        games.append({
+            "game_name": game_name,
+            "tier": latest.get("tier"),
+            "am": latest.get("am"),
+            "questers": [row.get("total_users", 0) for row in rows],
+            "bot_pct": [_bot_pct(row.get("bot_users", 0), row.get("total_users", 0)) for row in rows],
+            "quests": [row.get("quest_count", 0) for row in rows],
+        })
+    games.sort(key=lambda g: g["questers"][-1], reverse=True)
+
+    return {
+        "weeks": [week.isoformat() for week in weeks],
+        "overall": overall,
+        "games": games,
+    }
+
+
+def register(mcp):
+    """
+    Register aggregate-store tools with the MCP server.
+
+    Tools registered:
+    - weekly_decomposition: Phase 2 New/Discontinued/Continuing decomposition for any pair of weeks
+    - weekly_trends: N-week per-game trend matrix (questers, bot %, quests available)
+    """
+
+    @mcp.tool()
+    def weekly_decomposition(curr_week: str = "", prev_week: str = "", caller: str = "") -> str:
+        """
+        Phase 2 WoW decomposition computed from the frozen weekly aggregate store.
+
+        Only weeks not yet stored are scanned in BigQuery; repeat requests are free.
+        Weeks that ended less than 7 days ago are rescanned every 15 minutes,
+        since late events and bot labels still change them.
+
+        Args:
+            curr_week: Any date in the current comparison week (YYYY-MM-DD).
+                       Defaults to the last complete week.
+            prev_week: Any date in the baseline week (YYYY-MM-DD).
+                       Defaults to the week before curr_week.
+            caller: Name of the prompt this call is for (e.g. "weekly_quester_report"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with overall WoW, bucket totals (with human/bot deltas) and per-game rows
+        """
+        try:
+            curr = parse_week(curr_week) if curr_week else complete_weeks(1)[0]
+            prev = parse_week(prev_week) if prev_week else curr - datetime.timedelta(weeks=1)
+            return json.dumps(decompose(curr, prev, caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
+
+    @mcp.tool()
+    def weekly_trends(weeks: int = 4, caller: str = "") -> str:
+        """
+        Weekly trend matrix for the last N complete weeks from the aggregate store.
+
+        Args:
+            weeks: Number of complete weeks to include (default: 4)
+            caller: Name of the prompt this call is for (e.g. "weekly_quester_report"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with overall questers per week (with WoW %) and per-game
+            questers / bot % / quests available per week
+        """
+        try:
+            return json.dumps(trend_matrix(complete_weeks(weeks), caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
@@ -0,0 +1,161 @@
+"""
+Alerts - Persisted Phase 3 alert snapshots and delta alerting
+
+phase3_quest_alerts.sql returns every active quest, mostly "✅ No Issues".
+Each run of the alert extraction is stored as a snapshot of per-quest alert
+state (flag, priority, message), so alerts_since returns only what changed
+since an earlier run: new alerts, alerts whose flag or priority changed,
+and resolved alerts. digests.py records a snapshot from the same scan.
+
+The last MAX_SNAPSHOTS snapshots are kept.
+"""
+import datetime
+import json
+
+import pyarrow as pa
+
+import store
+from resources import PHASE3_QUEST_ALERTS_SQL
+from tools import run_query
+
+TABLE = "alert_snapshots"
+MAX_SNAPSHOTS = 30
+NO_ISSUE_PRIORITY = 5
+
+SCHEMA = pa.schema([
+    ("quest_id", pa.string()),
+    ("game_name", pa.string()),
+    ("quest_name", pa.string()),
+    ("account_manager", pa.string()),
+    ("alert_priority", pa.int64()),
+    ("alert_flag", pa.string()),
+    ("alert_message", pa.string()),
+])
+
+
+def _run_key(moment: datetime.datetime) -> str:
+    """Sortable partition key for a run, e.g. 2026-01-05T09-30-00-000000Z"""
+    return moment.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H-%M-%S-%fZ")
+
+
+def _parse_run(value: str) -> str:
+    """Run key for a last_run value: a run key, or any ISO timestamp (UTC if naive)"""
+    try:
+        moment = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value  # already a run key
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return _run_key(moment)
+
+
+def run_and_snapshot(caller: str = None) -> tuple:
+    """
+    Run the alert extraction once and store its alert state as a snapshot.
+
+    Returns (run key, full alert rows).
+    """
+    rows = run_query(PHASE3_QUEST_ALERTS_SQL, caller=caller or "alerts")
+    moment = datetime.datetime.now(datetime.timezone.utc)
+    # Never overwrite another run's snapshot, even one taken in the same microsecond
+    while store.has_partition(TABLE, _run_key(moment)):
+        moment += datetime.timedelta(microseconds=1)
+    run = _run_key(moment)
+    state = [
+        {**{column: row.get(column) for column in SCHEMA.names}, "quest_id": str(row["quest_id"])}
+        for row in rows
+    ]
+    store.write_partition(TABLE, run, state, SCHEMA)
+
+    for old_run in store.list_partitions(TABLE)[:-MAX_SNAPSHOTS]:
+        store.delete_partition(TABLE, old_run)
+    return run, rows
+
+
+def _is_alert(row: dict) -> bool:
+    return (row.get("alert_priority") or NO_ISSUE_PRIORITY) < NO_ISSUE_PRIORITY
+
+
+def diff(previous: list, current: list) -> dict:
+    """New, changed and resolved alerts between two snapshots (keyed by quest_id)"""
+    before = {row["quest_id"]: row for row in previous}
+    after = {row["quest_id"]: row for row in current}
+
+    new, changed, resolved = [], [], []
+    for quest_id, row in after.items():
+        old = before.get(quest_id)
+        if not _is_alert(row):
+            continue
+        if old is None or not _is_alert(old):
+            new.append(row)
+        elif (old["alert_flag"], old["alert_priority"]) != (row["alert_flag"], row["alert_priority"]):
+            changed.append({**row, "prev_alert_flag": old["alert_flag"], "prev_alert_priority": old["alert_priority"]})
+    for quest_id, old in before.items():
+        row = after.get(quest_id)
+        if _is_alert(old) and (row is None or not _is_alert(row)):
+            resolved.append({**old, "now": row["alert_flag"] if row else "No longer active"})
+
+    for rows in (new, changed, resolved):
+        rows.sort(key=lambda r: (r["alert_priority"] or NO_ISSUE_PRIORITY, r["game_name"] or "", r["quest_name"] or ""))
+    return {"new": new, "changed": changed, "resolved": resolved}
+
+
+def alerts_delta(last_run: str = None, caller: str = None) -> dict:
+    """
+    Run the alert extraction and compare it with an earlier snapshot.
+
+    `last_run` picks the latest snapshot at or before it (a run key or ISO
+    timestamp); by default the most recent snapshot is used.
+    """
+    earlier = store.list_partitions(TABLE)
+    if last_run:
+        cutoff = _parse_run(last_run)
+        earlier = [run for run in earlier if run <= cutoff]
+    baseline = earlier[-1] if earlier else None
+    previous = store.read_partition(TABLE, baseline) if baseline else []
+
+    run, _ = run_and_snapshot(caller)
+    current = store.read_partition(TABLE, run)
+    delta = diff(previous, current)
+
+    return {
+        "run": run,
+        "compared_to": baseline,
+        "note": None if baseline else "No earlier snapshot: every current alert is reported as new.",
+        "active_alerts": sum(1 for row in current if _is_alert(row)),
+        **delta,
+    }
+
+
+def register(mcp):
+    """
+    Register delta alerting tools with the MCP server.
+
+    Tools registered:
+    - alerts_since: Phase 3 alerts that are new, changed or resolved since an earlier run
+    """
+
+    @mcp.tool()
+    def alerts_since(last_run: str = "", caller: str = "") -> str:
+        """
+        Run the Phase 3 alert audit and return ONLY what changed since an earlier run.
+
+        Much smaller than the full audit: quests with no issues, and alerts
+        that are unchanged, are left out.
+
+        Args:
+            last_run: The "run" value from a previous alerts_since response, or
+                      any ISO timestamp; compares against the latest snapshot at
+                      or before it. Defaults to the most recent snapshot.
+            caller: Name of the prompt this call is for (e.g. "questers_report"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with run (pass as last_run next time), compared_to,
+            active_alerts count, and lists of new alerts, changed alerts (with
+            prev_alert_flag / prev_alert_priority) and resolved alerts
+        """
+        try:
+            return json.dumps(alerts_delta(last_run or None, caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
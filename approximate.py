@@ -0,0 +1,140 @@
+"""
+Approximate - Fast-answer accuracy modes for exploratory questions
+
+"Roughly how did questers move?" does not need an exact COUNT(DISTINCT) over
+hundreds of millions of rows. Queries can run in one of three modes:
+
+- exact  : SQL runs unchanged (default)
+- approx : COUNT(DISTINCT x) → APPROX_COUNT_DISTINCT(x) (HyperLogLog++)
+- sample : events restricted to a deterministic hash sample of visitors;
+           user/completion counts are scaled back up by 1 / sample rate
+           (phase statements with a known list of count columns only)
+
+The visitor sample is keyed on FARM_FINGERPRINT(visitor_id), so the same
+visitors are in every week and every game - WoW deltas and bot % stay
+comparable. It cuts shuffle and slot time; bytes scanned only drop for
+columns BigQuery can skip, since billing is per column, not per row.
+
+Approximate answers always carry an error bound and a reminder that the
+exact version should run only after the user confirms.
+"""
+import math
+import re
+
+ACCURACY_MODES = ("exact", "approx", "sample")
+
+SAMPLE_RATE = 0.1  # 10% of visitors
+_SAMPLE_BUCKETS = 10_000
+
+# BigQuery APPROX_COUNT_DISTINCT uses HLL++ at precision 15: relative standard error ≈ 1.04 / sqrt(2^15)
+HLL_RELATIVE_STD_ERROR = 1.04 / math.sqrt(2 ** 15)
+Z_95 = 1.96
+
+_COUNT_DISTINCT = re.compile(r"COUNT\s*\(\s*DISTINCT\s+", re.IGNORECASE)
+_EVENT_TABLE = re.compile(r"`app_immutable_play\.event`(\s+(?:AS\s+)?e\b)", re.IGNORECASE)
+
+# Result columns holding visitor or completion counts, per statement (scaled in
+# sample mode). Ratios such as bot_pct or completions_per_user are left as-is, and
+# quest counts are not scalable: a sample sees fewer distinct quests. Statements
+# not listed (Phase 0 and the Phase 3 alerts compare counts with thresholds in
+# SQL) cannot run sampled.
+SAMPLE_COUNT_COLUMNS = {
+    "phase1_weekly_trends#1": ("gameplay_questers",),
+    "phase1_weekly_trends#2": ("gameplay_questers",),
+    "phase1_weekly_trends#3": ("completions", "unique_users", "bot_users", "human_users"),
+    "phase1_weekly_trends#4": ("gameplay_questers",),
+    "phase2_decomposition#1": ("prev_users", "prev_humans", "prev_bots", "curr_users", "curr_humans",
+                               "curr_bots", "delta_total", "delta_humans", "delta_bots"),
+    "phase3_quest_completions#1": ("quest_completions", "unique_completers"),
+    "phase3_quest_completions#2": ("quest_completions", "unique_completers", "bot_completers", "human_completers"),
+    "phase3_quest_completions#3": ("quest_completions", "unique_completers", "bot_completers", "human_completers"),
+}
+
+
+def validate(accuracy: str) -> None:
+    """Raise ValueError for unknown accuracy modes"""
+    if accuracy not in ACCURACY_MODES:
+        raise ValueError(f"accuracy must be one of {', '.join(ACCURACY_MODES)} (got '{accuracy}')")
+
+
+def rewrite(sql: str, accuracy: str, statement: str = None) -> str:
+    """
+    Rewrite SQL for the requested accuracy mode.
+
+    `statement` is the phase statement key (see resources.identify_statement);
+    sample mode raises ValueError for statements without known count columns.
+    """
+    validate(accuracy)
+    if accuracy == "approx":
+        return _COUNT_DISTINCT.sub("APPROX_COUNT_DISTINCT(", sql)
+    if accuracy == "sample":
+        if statement not in SAMPLE_COUNT_COLUMNS:
+            raise ValueError(
+                f"accuracy='sample' only supports statements whose count columns are known "
+                f"({', '.join(SAMPLE_COUNT_COLUMNS)}); got {statement or 'ad-hoc SQL'}. "
+                "Use accuracy='approx' instead."
+            )
+        threshold = int(SAMPLE_RATE * _SAMPLE_BUCKETS)
+        sampled_events = (
+            "(SELECT * FROM `app_immutable_play.event` "
+            f"WHERE MOD(ABS(FARM_FINGERPRINT(CAST(visitor_id AS STRING))), {_SAMPLE_BUCKETS}) < {threshold})"
+        )
+        rewritten, replaced = _EVENT_TABLE.subn(lambda m: sampled_events + m.group(1), sql)
+        if not replaced:
+            raise ValueError("accuracy='sample' needs the event table aliased as e "
+                             "(FROM `app_immutable_play.event` e)")
+        return rewritten
+    return sql
+
+
+def _sample_error(sampled_count: int) -> float:
+    """95% relative error of a count estimated from a Bernoulli visitor sample"""
+    if sampled_count <= 0:
+        return None
+    return round(Z_95 * math.sqrt((1 - SAMPLE_RATE) / sampled_count), 4)
+
+
+def annotate(rows: list, accuracy: str, statement: str = None) -> dict:
+    """
+    Wrap approximate results with their error bound.
+
+    In sample mode, the statement's count columns are scaled to
+    full-population estimates and each row gets `_error_95` (per-column 95%
+    relative error; none for negative deltas).
+    """
+    if accuracy == "approx":
+        return {
+            "accuracy": "approx",
+            "rows": rows,
+            "error_bound": {
+                "method": "APPROX_COUNT_DISTINCT (HyperLogLog++)",
+                "relative_error_95": round(Z_95 * HLL_RELATIVE_STD_ERROR, 4),
+                "applies_to": "distinct counts; plain COUNT(*) and ratios of exact counts are exact",
+            },
+            "exact_version": "Approximate answer. Re-run with accuracy='exact' only if the user confirms.",
+        }
+
+    count_columns = SAMPLE_COUNT_COLUMNS[statement]
+    scaled_rows = []
+    for row in rows:
+        scaled = dict(row)
+        errors = {}
+        for name in count_columns:
+            value = row.get(name)
+            if value is not None:
+                scaled[name] = int(round(value / SAMPLE_RATE))
+                errors[name] = _sample_error(value)
+        if errors:
+            scaled["_error_95"] = errors
+        scaled_rows.append(scaled)
+    return {
+        "accuracy": "sample",
+        "rows": scaled_rows,
+        "error_bound": {
+            "method": f"Deterministic {SAMPLE_RATE:.0%} visitor sample (FARM_FINGERPRINT(visitor_id)), counts scaled by {1 / SAMPLE_RATE:g}x",
+            "relative_error_95": "per row/column in _error_95: 1.96 * sqrt((1 - rate) / sampled_count)",
+            "applies_to": f"scaled columns: {', '.join(count_columns)}; percentages and per-user ratios are unscaled sample estimates",
+            "quest_counts": "Distinct quest counts are not scaled and come out LOW: a visitor sample misses quests with few completers",
+        },
+        "exact_version": "Approximate answer. Re-run with accuracy='exact' only if the user confirms.",
+    }
@@ -0,0 +1,135 @@
+"""
+Batch - Multi-game investigation in a single scan
+
+An AM asking about a whole portfolio used to mean one event scan per game.
+These tools run one scan filtered with `g.game_name IN UNNEST(@game_names)`,
+grouped by game, and split the combined result into per-game sections.
+"""
+import json
+
+import approximate
+import dimensions
+from resources import PHASE1_QUERIES, PHASE3_COMPLETIONS_QUERIES, identify_statement
+from tools import run_query
+
+# Statements used for batch scans (see the SQL files for the full queries)
+GAME_TRENDS_SQL = PHASE1_QUERIES[4]["sql"]
+QUEST_COMPLETIONS_SQL = PHASE3_COMPLETIONS_QUERIES[3]["sql"]
+
+
+def _clean_names(game_names: list) -> list:
+    """Strip blanks and duplicates while keeping the caller's order"""
+    seen = []
+    for name in game_names:
+        name = name.strip()
+        if name and name not in seen:
+            seen.append(name)
+    if not seen:
+        raise ValueError("Provide at least one game name")
+    return seen
+
+
+def split_by_game(rows: list, game_names: list) -> dict:
+    """
+    Split combined rows into per-game sections.
+
+    Every requested game gets a section (empty if it had no rows), so games
+    with zero activity are visible rather than silently missing.
+    """
+    sections = {name: [] for name in game_names}
+    for row in rows:
+        sections.setdefault(row["game_name"], []).append(
+            {key: value for key, value in row.items() if key != "game_name"}
+        )
+    return sections
+
+
+def _run_batch(sql: str, game_names: list, accuracy: str, caller: str = None) -> dict:
+    """
+    Run one batch statement and split it per game, carrying any error bound.
+
+    Unknown game names do not abort the batch: they are listed under
+    no_activity with close matches, and the known games are still scanned.
+    """
+    known, unknown = dimensions.resolve_games(_clean_names(game_names))
+    statement = identify_statement(sql)
+
+    result, rows = {}, []
+    if known:
+        sql, parameters = dimensions.pushdown(sql, {"game_names": list(known)})
+        rows = run_query(approximate.rewrite(sql, accuracy, statement), parameters, caller=caller or "batch",
+                         statement=statement)
+        if accuracy != "exact":
+            result = approximate.annotate(rows, accuracy, statement)
+            rows = result.pop("rows")
+
+    sections = split_by_game(rows, list(known))
+    result["games"] = sections
+    result["no_activity"] = [name for name, game_rows in sections.items() if not game_rows] + list(unknown.values())
+    return result
+
+
+def investigate_many(game_names: list, accuracy: str = "exact", caller: str = None) -> dict:
+    """Last 4 complete weeks of questers / bot % / quests for several games in one scan"""
+    return _run_batch(GAME_TRENDS_SQL, game_names, accuracy, caller)
+
+
+def quest_completions_many(game_names: list, accuracy: str = "exact", caller: str = None) -> dict:
+    """Last 3 days of quest completions with bot % for several games in one scan"""
+    return _run_batch(QUEST_COMPLETIONS_SQL, game_names, accuracy, caller)
+
+
+def register(mcp):
+    """
+    Register batch tools with the MCP server.
+
+    Tools registered:
+    - investigate_games: Weekly trend for a list of games (one scan)
+    - quest_completions_batch: Quest-level completions for a list of games (one scan)
+    """
+
+    @mcp.tool()
+    def investigate_games(game_names: list[str], accuracy: str = "exact", caller: str = "") -> str:
+        """
+        Batch version of investigate_game: last 4 complete weeks for several games.
+
+        Runs ONE event scan for all games instead of one per game.
+
+        Args:
+            game_names: Games to investigate, e.g. ["MetalCore", "Cross The Ages"]
+            accuracy: "exact" (default), "approx" or "sample" (see query_bigquery)
+            caller: Name of the prompt this call is for (e.g. "investigate_games"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with one section per game (week_start, gameplay_questers,
+            gameplay_quests, bot_pct) and the games with no activity
+            (unknown names are listed there with close matches)
+        """
+        try:
+            return json.dumps(investigate_many(game_names, accuracy, caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
+
+    @mcp.tool()
+    def quest_completions_batch(game_names: list[str], accuracy: str = "exact", caller: str = "") -> str:
+        """
+        Batch version of quest_completions_breakdown(game_name) for several games.
+
+        Runs ONE event scan (last 3 days) for all games instead of one per game.
+
+        Args:
+            game_names: Games to break down, e.g. ["MetalCore", "Cross The Ages"]
+            accuracy: "exact" (default), "approx" or "sample" (see query_bigquery)
+            caller: Name of the prompt this call is for (e.g. "investigate_games"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with one section per game (quest_name, quest_id, completions,
+            completers, bot %, completions per user) and the games with no activity
+            (unknown names are listed there with close matches)
+        """
+        try:
+            return json.dumps(quest_completions_many(game_names, accuracy, caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
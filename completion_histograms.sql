@@ -0,0 +1,43 @@
+-- Completion Histograms: Per-(day, quest, bot flag) distribution of completions per user
+-- Feeds the local distribution store (distributions.py) used for farming detection
+-- Only days missing from the store are scanned: @start_date (inclusive) to @end_date (exclusive)
+--
+-- Each row says "`users` users completed this quest `completions_per_user` times that day".
+-- Histograms merge by adding `users`, so p50/p90/p99 and the top-1% completion share
+-- for any window come from stored rows without re-scanning events.
+-- Note: Covers ALL quest types (gameplay, social post, engage), like Phase 1 Query 3
+
+WITH user_days AS (
+  SELECT 
+    DATE(e.event_ts) as day,
+    g.game_name,
+    q.quest_id,
+    q.quest_name,
+    COALESCE(s.bot_score = 1, FALSE) as is_bot,
+    e.visitor_id,
+    COUNT(*) as completions
+  FROM `app_immutable_play.event` e
+  JOIN `app_immutable_play.visitor` v ON e.visitor_id = v.visitor_id
+  LEFT JOIN `app_immutable_play.quest` q ON e.quest_id = q.quest_id
+  LEFT JOIN `app_immutable_play.game` g ON q.game_id = g.game_id
+  LEFT JOIN `mod_imx.sybil_score` s ON v.user_id = s.user_id
+  WHERE 
+    e.event_ts >= TIMESTAMP(@start_date)
+    AND e.event_ts < TIMESTAMP(@end_date)
+    AND v.is_front_end_cohort = TRUE
+    AND (v.is_immutable_employee = FALSE OR v.is_immutable_employee IS NULL)
+    AND g.game_name NOT IN ('Guild of Guardians', 'Gods Unchained')
+    AND g.plan_name != 'Maintenance'
+  GROUP BY day, g.game_name, q.quest_id, q.quest_name, is_bot, e.visitor_id
+)
+SELECT 
+  day,
+  game_name,
+  quest_id,
+  quest_name,
+  is_bot,
+  completions as completions_per_user,
+  COUNT(*) as users
+FROM user_days
+GROUP BY day, game_name, quest_id, quest_name, is_bot, completions_per_user
+ORDER BY day, game_name, quest_id, is_bot, completions_per_user;
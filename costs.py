@@ -0,0 +1,161 @@
+"""
+Costs - Job cost attribution by phase, statement, caller and week
+
+Every job is labelled by tools.submit_query (app=questers, phase, statement,
+caller, session). cost_report aggregates bytes, slot-hours and latency
+over those labels from INFORMATION_SCHEMA.JOBS (job_costs.sql), or from
+the local job log when running offline (simulated warehouse, or when
+INFORMATION_SCHEMA is not readable).
+
+The local log is one JSON line per finished job under the data directory.
+"""
+import datetime
+import json
+import os
+import threading
+
+import store
+import tools
+from resources import JOB_COSTS_SQL
+
+JOB_LOG_PATH = store.DATA_DIR / "job_log.jsonl"
+REGION = os.environ.get("QUESTERS_BQ_REGION", "region-us")
+GROUP_BY = ("phase", "statement", "caller", "week_start")
+MEASURES = ("jobs", "bytes_processed", "bytes_billed", "slot_ms", "elapsed_ms", "cache_hits")
+
+_log_lock = threading.Lock()
+
+
+def log_job(query_job) -> None:
+    """Append a finished job's labels and cost to the local job log"""
+    created = query_job.created
+    ended = query_job.ended or datetime.datetime.now(datetime.timezone.utc)
+    record = {
+        "job_id": query_job.job_id,
+        "created": created.isoformat() if created else None,
+        "labels": dict(query_job.labels or {}),
+        "bytes_processed": query_job.total_bytes_processed or 0,
+        "bytes_billed": query_job.total_bytes_billed or 0,
+        "slot_ms": query_job.slot_millis or 0,
+        "elapsed_ms": int((ended - created).total_seconds() * 1000) if created else 0,
+        "cache_hit": bool(query_job.cache_hit),
+    }
+    with _log_lock:
+        JOB_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(JOB_LOG_PATH, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def _local_rows(days: int) -> list:
+    """Job log records since `days` ago, shaped like job_costs.sql rows"""
+    if not JOB_LOG_PATH.exists():
+        return []
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    rows = []
+    with open(JOB_LOG_PATH) as f:
+        for line in f:
+            record = json.loads(line)
+            created = datetime.datetime.fromisoformat(record["created"])
+            if created < since:
+                continue
+            day = created.date()
+            rows.append({
+                "week_start": (day - datetime.timedelta(days=day.weekday())).isoformat(),
+                "phase": record["labels"].get("phase"),
+                "statement": record["labels"].get("statement"),
+                "caller": record["labels"].get("caller"),
+                "jobs": 1,
+                "bytes_processed": record["bytes_processed"],
+                "bytes_billed": record["bytes_billed"],
+                "slot_ms": record["slot_ms"],
+                "elapsed_ms": record["elapsed_ms"],
+                "cache_hits": int(record["cache_hit"]),
+            })
+    return rows
+
+
+def _bigquery_rows(days: int) -> list:
+    """Per-(week, phase, statement, caller) job costs from INFORMATION_SCHEMA.JOBS"""
+    sql = JOB_COSTS_SQL.replace("`region-us`", f"`{REGION}`")
+    return tools.run_query(sql, {"days": days}, caller="cost_report")
+
+
+def report(days: int = 30, group_by: list = None, source: str = "auto") -> dict:
+    """
+    Job costs rolled up by the given label dimensions, most bytes billed first.
+
+    source: "bigquery", "local" or "auto" (local for the simulated warehouse,
+    otherwise BigQuery with a fallback to the local log).
+    """
+    group_by = group_by or ["phase"]
+    unknown = [dim for dim in group_by if dim not in GROUP_BY]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}; choose from {', '.join(GROUP_BY)}")
+
+    note = None
+    if source == "local" or (source == "auto" and os.environ.get("QUESTERS_FAKE_BIGQUERY")):
+        source, rows = "local", _local_rows(days)
+    else:
+        try:
+            source, rows = "bigquery", _bigquery_rows(days)
+        except Exception as e:
+            if source == "bigquery":
+                raise
+            source, rows = "local", _local_rows(days)
+            note = f"INFORMATION_SCHEMA.JOBS unavailable ({e}); using the local job log"
+
+    groups = {}
+    for row in rows:
+        key = tuple(str(row[dim]) if row[dim] is not None else None for dim in group_by)
+        totals = groups.setdefault(key, dict.fromkeys(MEASURES, 0))
+        for measure in MEASURES:
+            totals[measure] += row[measure] or 0
+
+    result_rows = []
+    for key, totals in groups.items():
+        result_rows.append({
+            **dict(zip(group_by, key)),
+            "jobs": totals["jobs"],
+            "gb_processed": round(totals["bytes_processed"] / 1e9, 2),
+            "gb_billed": round(totals["bytes_billed"] / 1e9, 2),
+            "slot_hours": round(totals["slot_ms"] / 3_600_000, 2),
+            "avg_latency_s": round(totals["elapsed_ms"] / totals["jobs"] / 1000, 1) if totals["jobs"] else None,
+            "cache_hit_pct": round(100.0 * totals["cache_hits"] / totals["jobs"], 1) if totals["jobs"] else None,
+        })
+    result_rows.sort(key=lambda row: row["gb_billed"], reverse=True)
+
+    return {"source": source, "days": days, "group_by": group_by, "note": note, "rows": result_rows}
+
+
+def register(mcp):
+    """
+    Register cost attribution tools with the MCP server.
+
+    Tools registered:
+    - cost_report: Bytes, slot-hours and latency of this server's jobs by phase, statement, caller or week
+    """
+
+    @mcp.tool()
+    def cost_report(days: int = 30, group_by: str = "phase", source: str = "auto") -> str:
+        """
+        Where the BigQuery spend goes: job costs grouped by label.
+
+        Jobs are labelled with the phase file, statement, calling prompt or
+        server component, and session.
+
+        Args:
+            days: How far back to look (default: 30)
+            group_by: Comma-separated dimensions from phase, statement, caller,
+                      week_start (default: "phase"), e.g. "phase,caller"
+            source: "auto" (default), "bigquery" (INFORMATION_SCHEMA.JOBS)
+                    or "local" (this server's job log)
+
+        Returns:
+            JSON rows with jobs, GB processed / billed, slot-hours, average
+            latency and cache hit % per group, most GB billed first
+        """
+        try:
+            dims = [dim.strip() for dim in group_by.split(",") if dim.strip()]
+            return json.dumps(report(days, dims, source), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
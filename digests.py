@@ -0,0 +1,146 @@
+"""
+Digests - Per-account-manager Phase 3 alert digests from one scan
+
+Each AM only wants their own games' alerts, but phase3_quest_alerts.sql
+covers every quest over 30 days. Instead of re-running it per AM, the alert
+extraction runs once and its rows are partitioned by account manager: one
+stored digest per AM with only priority 1-3 (urgent to medium) alerts.
+get_am_digest then reads a single small partition.
+
+Alerts are relative to "now" (48h / 7d windows), so digests older than
+DIGEST_MAX_AGE_SECONDS are regenerated (one scan for all AMs) on next use.
+"""
+import datetime
+import difflib
+import json
+import re
+import threading
+
+import pyarrow as pa
+
+import alerts
+import store
+
+TABLE = "am_digests"
+DIGEST_MAX_AGE_SECONDS = 6 * 3600  # 6 hours
+MAX_PRIORITY = 3  # 1=Urgent, 2=High, 3=Medium
+
+SCHEMA = pa.schema([
+    ("account_manager", pa.string()),
+    ("game_name", pa.string()),
+    ("plan_name", pa.string()),
+    ("quest_name", pa.string()),
+    ("alert_priority", pa.int64()),
+    ("alert_flag", pa.string()),
+    ("alert_message", pa.string()),
+    ("bot_rate_pct", pa.float64()),
+    ("users_48h", pa.int64()),
+    ("completions_per_user", pa.float64()),
+])
+
+_generate_lock = threading.Lock()
+
+
+def am_key(account_manager: str) -> str:
+    """Partition key for an account manager ("Jane Doe" -> "jane-doe")"""
+    return re.sub(r"[^a-z0-9]+", "-", (account_manager or "Unassigned").lower()).strip("-") or "unassigned"
+
+
+def generate(caller: str = None) -> dict:
+    """
+    Run the alert extraction once and store one digest per AM.
+
+    AMs with no priority 1-3 alerts get an empty digest, as do AMs from an
+    earlier run that no longer appear. The same scan is recorded as an
+    alert snapshot for alerts_since. Returns {am: alert count}.
+    """
+    by_am = {key: [] for key in store.list_partitions(TABLE)}
+    _, rows = alerts.run_and_snapshot(caller or "digests")
+    for row in rows:
+        am_alerts = by_am.setdefault(am_key(row["account_manager"]), [])
+        if (row["alert_priority"] or 5) <= MAX_PRIORITY:
+            am_alerts.append({column: row.get(column) for column in SCHEMA.names})
+
+    for key, am_alerts in by_am.items():
+        am_alerts.sort(key=lambda alert: (alert["alert_priority"], -(alert["bot_rate_pct"] or 0)))
+        store.write_partition(TABLE, key, am_alerts, SCHEMA)
+    return {key: len(am_alerts) for key, am_alerts in by_am.items()}
+
+
+def _is_fresh(key: str) -> bool:
+    """Whether the last generation is recent (an unknown AM is judged by any digest, so typos don't rescan)"""
+    keys = store.list_partitions(TABLE)
+    if not keys:
+        return False
+    updated_at = store.partition_updated_at(TABLE, key if key in keys else keys[0])
+    if updated_at is None:
+        return False
+    age = datetime.datetime.now(datetime.timezone.utc) - updated_at
+    return age.total_seconds() < DIGEST_MAX_AGE_SECONDS
+
+
+def am_digest(account_manager: str, refresh: bool = False, caller: str = None) -> dict:
+    """
+    Stored digest for one AM, regenerating all digests first if it is stale.
+
+    Raises ValueError with close matches when the AM is unknown.
+    """
+    key = am_key(account_manager)
+    if refresh or not _is_fresh(key):
+        with _generate_lock:
+            # Another request may have regenerated while we waited
+            if refresh or not _is_fresh(key):
+                generate(caller)
+
+    if not store.has_partition(TABLE, key):
+        matches = difflib.get_close_matches(key, store.list_partitions(TABLE), n=3)
+        hint = f" Did you mean: {', '.join(matches)}?" if matches else ""
+        raise ValueError(f"Unknown account manager '{account_manager}'.{hint}")
+
+    am_alerts = store.read_partition(TABLE, key)
+    by_priority = {}
+    for alert in am_alerts:
+        by_priority[alert["alert_priority"]] = by_priority.get(alert["alert_priority"], 0) + 1
+    return {
+        "account_manager": am_alerts[0]["account_manager"] if am_alerts else account_manager,
+        "generated_at": store.partition_updated_at(TABLE, key).isoformat(),
+        "alerts_by_priority": by_priority,
+        "games": sorted({alert["game_name"] for alert in am_alerts if alert["game_name"]}),
+        "alerts": am_alerts,
+    }
+
+
+def register(mcp):
+    """
+    Register digest tools with the MCP server.
+
+    Tools registered:
+    - get_am_digest: One account manager's priority 1-3 Phase 3 alerts from the stored digests
+    """
+
+    @mcp.tool()
+    def get_am_digest(am: str, refresh: bool = False, caller: str = "") -> str:
+        """
+        Phase 3 alert digest for ONE account manager (priority 1-3 only).
+
+        Digests for every AM are generated together from a single run of the
+        Phase 3 alert audit and stored; this reads one AM's digest. Use it
+        instead of running phase3_quest_alerts.sql when an AM asks about
+        their games.
+
+        Args:
+            am: Account manager name (case-insensitive), or "Unassigned"
+            refresh: Regenerate all digests now instead of using stored ones
+                     (they are regenerated automatically after 6 hours)
+            caller: Name of the prompt this call is for (e.g. "questers_report"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with generated_at, alert counts by priority, the AM's games
+            with alerts, and the alerts (game, quest, flag, message, priority,
+            bot rate, users in 48h, completions per user)
+        """
+        try:
+            return json.dumps(am_digest(am, refresh, caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
@@ -0,0 +1,224 @@
+"""
+Dimensions - Cached game/quest index and game_id predicate pushdown
+
+Single-game questions filter `g.game_name = @game_name` after joining
+event → quest → game, so BigQuery still reads every event in the window.
+Events carry game_id, so resolving the name to ids up front lets the same
+filter run on the event scan itself (`e.game_id IN UNNEST(@game_ids)`).
+
+The game and quest tables are small; they are loaded into memory and
+refreshed every REFRESH_SECONDS on next use. In between, quests created
+since the newest create_ts already loaded are picked up every
+QUEST_REFRESH_SECONDS (the full refresh catches edited validity dates).
+"""
+import datetime
+import difflib
+import json
+import re
+import threading
+import time
+
+import tools
+from resources import DIMENSION_QUERIES
+
+REFRESH_SECONDS = 3600  # 1 hour
+QUEST_REFRESH_SECONDS = 300  # 5 minutes
+
+_lock = threading.Lock()
+_index = {
+    "loaded_at": 0.0,
+    "quests_checked_at": 0.0,
+    "version": 0,             # bumped whenever games or quests change
+    "games": {},              # game_id -> game row
+    "game_ids_by_name": {},   # lowercase game_name -> [game_id, ...]
+    "quests": {},             # quest_id -> quest row
+    "quest_ids_by_game": {},  # game_id -> [quest_id, ...]
+}
+
+_GAME_NAME_FILTER = re.compile(r"g\.game_name\s*=\s*@game_name\b", re.IGNORECASE)
+_GAME_NAMES_FILTER = re.compile(r"g\.game_name\s+IN\s+UNNEST\s*\(\s*@game_names\s*\)", re.IGNORECASE)
+_EVENT_ALIAS = re.compile(r"`app_immutable_play\.event`\s+(?:AS\s+)?e\b", re.IGNORECASE)
+
+
+def refresh(force: bool = False) -> None:
+    """Reload games and quests if the index is older than REFRESH_SECONDS"""
+    with _lock:
+        if not force and time.time() - _index["loaded_at"] < REFRESH_SECONDS:
+            return
+
+        games = {row["game_id"]: row for row in tools.run_query(DIMENSION_QUERIES[1]["sql"], caller="dimensions")}
+        quests = {row["quest_id"]: row for row in tools.run_query(DIMENSION_QUERIES[2]["sql"], caller="dimensions")}
+
+        game_ids_by_name = {}
+        for game in games.values():
+            if game["game_name"]:
+                game_ids_by_name.setdefault(game["game_name"].lower(), []).append(game["game_id"])
+        quest_ids_by_game = {}
+        for quest in quests.values():
+            quest_ids_by_game.setdefault(quest["game_id"], []).append(quest["quest_id"])
+
+        _index.update(
+            loaded_at=time.time(),
+            quests_checked_at=time.time(),
+            version=_index["version"] + 1,
+            games=games,
+            game_ids_by_name=game_ids_by_name,
+            quests=quests,
+            quest_ids_by_game=quest_ids_by_game,
+        )
+
+
+def parse_ts(value):
+    """Timestamp column (ISO string from row_to_dict) as an aware datetime, or None"""
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(value) if isinstance(value, str) else value
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+def refresh_quests() -> int:
+    """
+    Pick up quests created since the newest create_ts in the index.
+
+    Runs a full refresh instead when one is due. Returns the number of new quests.
+    """
+    refresh()
+    with _lock:
+        if time.time() - _index["quests_checked_at"] < QUEST_REFRESH_SECONDS:
+            return 0
+
+        created = [parse_ts(quest["create_ts"]) for quest in _index["quests"].values()]
+        since = max((ts for ts in created if ts), default=datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc))
+        new_quests = [
+            row for row in tools.run_query(DIMENSION_QUERIES[3]["sql"], {"since": since}, caller="dimensions")
+            if row["quest_id"] not in _index["quests"]
+        ]
+        for quest in new_quests:
+            _index["quests"][quest["quest_id"]] = quest
+            _index["quest_ids_by_game"].setdefault(quest["game_id"], []).append(quest["quest_id"])
+
+        _index["quests_checked_at"] = time.time()
+        if new_quests:
+            _index["version"] += 1
+        return len(new_quests)
+
+
+def snapshot() -> tuple:
+    """(version, games, quests) copies of the current index, refreshing quests first if due"""
+    refresh_quests()
+    with _lock:
+        return _index["version"], dict(_index["games"]), dict(_index["quests"])
+
+
+def resolve_game(game_name: str) -> list:
+    """
+    Game ids for a game name (case-insensitive).
+
+    Raises ValueError with close matches when the name is unknown, so a typo
+    fails fast instead of running a full scan that returns nothing.
+    """
+    refresh()
+    game_ids = _index["game_ids_by_name"].get(game_name.strip().lower())
+    if not game_ids:
+        raise ValueError(_unknown_game(game_name))
+    return game_ids
+
+
+def _unknown_game(game_name: str) -> str:
+    """Unknown game message with close matches from the index"""
+    known = sorted(game["game_name"] for game in _index["games"].values() if game["game_name"])
+    matches = difflib.get_close_matches(game_name, known, n=3)
+    hint = f" Did you mean: {', '.join(matches)}?" if matches else ""
+    return f"Unknown game '{game_name}'.{hint}"
+
+
+def resolve_games(game_names: list) -> tuple:
+    """
+    Resolve several game names without failing on the unknown ones.
+
+    Returns ({stored game name: game ids} for the known names, in order, and
+    {name: unknown game message with close matches} for the rest).
+    """
+    refresh()
+    known, unknown = {}, {}
+    for name in game_names:
+        game_ids = _index["game_ids_by_name"].get(name.strip().lower())
+        if game_ids:
+            known[_index["games"][game_ids[0]]["game_name"]] = game_ids
+        else:
+            unknown[name] = _unknown_game(name)
+    return known, unknown
+
+
+def describe_game(game_name: str) -> dict:
+    """Dimension rows for a game and its quests"""
+    game_ids = resolve_game(game_name)
+    return {
+        "games": [_index["games"][game_id] for game_id in game_ids],
+        "quests": [
+            _index["quests"][quest_id]
+            for game_id in game_ids
+            for quest_id in _index["quest_ids_by_game"].get(game_id, [])
+        ],
+    }
+
+
+def pushdown(sql: str, parameters: dict = None) -> tuple:
+    """
+    Push game filters down onto the event scan.
+
+    `g.game_name = @game_name` and `g.game_name IN UNNEST(@game_names)` get a
+    matching `e.game_id IN UNNEST(@game_ids)`, with the names resolved to ids
+    here (and normalised to their stored spelling). Unknown names in
+    game_names are dropped (they cannot match); the filter only fails when
+    none of them is known. SQL without those filters (or without the event
+    table aliased as e) is returned unchanged.
+    """
+    parameters = dict(parameters or {})
+    if "game_ids" in parameters or not _EVENT_ALIAS.search(sql):
+        return sql, parameters
+
+    if _GAME_NAME_FILTER.search(sql) and parameters.get("game_name"):
+        game_ids = resolve_game(parameters["game_name"])
+        parameters["game_name"] = _index["games"][game_ids[0]]["game_name"]
+        pattern = _GAME_NAME_FILTER
+    elif _GAME_NAMES_FILTER.search(sql) and parameters.get("game_names"):
+        known, unknown = resolve_games(parameters["game_names"])
+        if not known:
+            raise ValueError(" ".join(unknown.values()))
+        game_ids = [game_id for ids in known.values() for game_id in ids]
+        parameters["game_names"] = list(known)
+        pattern = _GAME_NAMES_FILTER
+    else:
+        return sql, parameters
+
+    sql = pattern.sub(lambda m: f"{m.group(0)} AND e.game_id IN UNNEST(@game_ids)", sql, count=1)
+    parameters["game_ids"] = game_ids
+    return sql, parameters
+
+
+def register(mcp):
+    """
+    Register dimension tools with the MCP server.
+
+    Tools registered:
+    - game_info: Game metadata (id, tier, AM, target) and its quests from the cached index
+    """
+
+    @mcp.tool()
+    def game_info(game_name: str) -> str:
+        """
+        Look up a game in the cached dimension index (no event scan).
+
+        Args:
+            game_name: Game name (case-insensitive); unknown names return close matches
+
+        Returns:
+            JSON with the game row(s) (game_id, tier, AM, active_subscription,
+            monthly_gameplay_target) and its quests (id, name, categories,
+            create_ts, valid_from, valid_to)
+        """
+        try:
+            return json.dumps(describe_game(game_name), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
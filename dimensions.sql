@@ -0,0 +1,38 @@
+-- Dimensions: game and quest lookup tables for the in-memory dimension index
+-- Small tables (no event scan); refreshed periodically by dimensions.py
+-- Used to resolve game/quest names to ids before a query is sent, so filters
+-- can be pushed down onto the event scan (e.game_id = ...)
+
+-- QUERY 1: Games
+SELECT 
+  g.game_id,
+  g.game_name,
+  g.plan_name as tier,
+  g.account_manager_name as am,
+  g.active_subscription,
+  g.monthly_gameplay_target
+FROM `app_immutable_play.game` g;
+
+-- QUERY 2: Quests
+SELECT 
+  q.quest_id,
+  q.quest_name,
+  q.game_id,
+  q.quest_category as categories,
+  q.create_ts,
+  q.valid_from,
+  q.valid_to
+FROM `app_immutable_play.quest` q;
+
+-- QUERY 3: Quests Created Since (incremental refresh)
+-- Use parameterized query: @since (TIMESTAMP) - newest create_ts already in the index
+SELECT 
+  q.quest_id,
+  q.quest_name,
+  q.game_id,
+  q.quest_category as categories,
+  q.create_ts,
+  q.valid_from,
+  q.valid_to
+FROM `app_immutable_play.quest` q
+WHERE q.create_ts > @since;
@@ -0,0 +1,205 @@
+"""
+Distributions - Completions-per-user histograms for farming detection
+
+The farming checks (Phase 1 Query 3, quest_farming_analysis, the Phase 3
+alerts) use the mean completions per user, which hides the few grinders
+responsible for most completions. Instead, each complete day is scanned
+(completion_histograms.sql) into per-(quest, bot flag) histograms of
+completions per user and stored as a Parquet partition. Any window is the
+sum of its days' histograms, so p50/p90/p99 and the share of completions
+from the top 1% of users come from the store, without re-scanning events.
+Days within store.SETTLE_DAYS, whose bot flags can still change, are
+rescanned once their partition is older than store.UNSETTLED_MAX_AGE; older
+days are frozen.
+
+Completions per user is a small integer with a long tail, so exact sparse
+histograms ({completions: users}) stay compact and merge by addition; no
+approximate quantile sketch is needed. Users are counted per day: a window
+statistic describes user-days.
+"""
+import datetime
+import json
+import math
+import threading
+
+import pyarrow as pa
+
+import store
+from resources import COMPLETION_HISTOGRAMS_SQL
+from tools import run_query
+
+TABLE = "completion_histograms"
+
+SCHEMA = pa.schema([
+    ("day", pa.string()),
+    ("game_name", pa.string()),
+    ("quest_id", pa.string()),
+    ("quest_name", pa.string()),
+    ("is_bot", pa.bool_()),
+    ("completions_per_user", pa.int64()),
+    ("users", pa.int64()),
+])
+
+POPULATIONS = ("all", "human", "bot")
+TOP_SHARE_FRACTION = 0.01  # top 1% of users
+
+_ensure_lock = threading.Lock()
+
+
+def _is_current(day: datetime.date) -> bool:
+    """Whether a day's stored histograms can be reused (see store.is_current)"""
+    return store.is_current(TABLE, day.isoformat(), day + datetime.timedelta(days=1))
+
+
+def ensure_days(days: list, caller: str = None) -> list:
+    """
+    Make sure every day's histograms are current in the store, scanning only
+    the days missing or not yet settled (see store.is_current).
+
+    Returns the days that had to be scanned.
+    """
+    today = datetime.datetime.utcnow().date()
+    for day in days:
+        if day >= today:
+            raise ValueError(f"Day {day.isoformat()} is not complete yet; only complete days are stored")
+
+    if all(_is_current(d) for d in days):
+        return []
+
+    # One scanner at a time, so concurrent callers don't both scan the same missing day
+    with _ensure_lock:
+        missing = sorted(d for d in set(days) if not _is_current(d))
+        for start, end in store.contiguous_runs(missing, datetime.timedelta(days=1)):
+            rows = run_query(COMPLETION_HISTOGRAMS_SQL, {"start_date": start, "end_date": end},
+                             caller=caller or "distributions")
+
+            by_day = {}
+            day = start
+            while day < end:
+                by_day[day.isoformat()] = []
+                day += datetime.timedelta(days=1)
+            for row in rows:
+                # quest_id is an INTEGER in BigQuery; stored as a string like elsewhere
+                by_day[row["day"]].append({**row, "quest_id": str(row["quest_id"])})
+
+            for key, day_rows in by_day.items():
+                store.write_partition(TABLE, key, day_rows, SCHEMA)
+    return missing
+
+
+def merge(days: list, game_name: str = None, population: str = "all", caller: str = None) -> dict:
+    """
+    Merged histograms for a window: {(game_name, quest_id, quest_name): {completions: users}}.
+
+    `population` keeps all users, humans only or bots only.
+    """
+    if population not in POPULATIONS:
+        raise ValueError(f"population must be one of {', '.join(POPULATIONS)}")
+    ensure_days(days, caller)
+
+    merged = {}
+    for day in days:
+        for row in store.read_partition(TABLE, day.isoformat()):
+            if game_name and (row["game_name"] or "").lower() != game_name.lower():
+                continue
+            if population == "human" and row["is_bot"] or population == "bot" and not row["is_bot"]:
+                continue
+            histogram = merged.setdefault((row["game_name"], row["quest_id"], row["quest_name"]), {})
+            value = row["completions_per_user"]
+            histogram[value] = histogram.get(value, 0) + row["users"]
+    return merged
+
+
+def _quantile(values: list, counts: list, total: int, q: float) -> int:
+    """Nearest-rank quantile of a histogram (values ascending)"""
+    rank = max(1, math.ceil(q * total))
+    cumulative = 0
+    for value, count in zip(values, counts):
+        cumulative += count
+        if cumulative >= rank:
+            return value
+    return values[-1]
+
+
+def summarize(histogram: dict) -> dict:
+    """User-days, completions, mean, p50/p90/p99 and top-1% completion share of one histogram"""
+    values = sorted(histogram)
+    counts = [histogram[value] for value in values]
+    users = sum(counts)
+    completions = sum(value * count for value, count in zip(values, counts))
+    if not users:
+        return {"user_days": 0, "completions": 0}
+
+    # Completions of the heaviest 1% of user-days
+    remaining = max(1, math.ceil(TOP_SHARE_FRACTION * users))
+    top_completions = 0
+    for value, count in zip(reversed(values), reversed(counts)):
+        taken = min(count, remaining)
+        top_completions += taken * value
+        remaining -= taken
+        if remaining == 0:
+            break
+
+    return {
+        "user_days": users,
+        "completions": completions,
+        "mean": round(completions / users, 1),
+        "p50": _quantile(values, counts, users, 0.50),
+        "p90": _quantile(values, counts, users, 0.90),
+        "p99": _quantile(values, counts, users, 0.99),
+        "max": values[-1],
+        "top1_share_pct": round(100.0 * top_completions / completions, 1) if completions else None,
+    }
+
+
+def quest_distributions(days: list, game_name: str = None, population: str = "all",
+                        min_user_days: int = 20, caller: str = None) -> list:
+    """Per-quest distribution summaries, most concentrated (highest top-1% share) first"""
+    quests = []
+    for (game, quest_id, quest_name), histogram in merge(days, game_name, population, caller).items():
+        summary = summarize(histogram)
+        if summary["user_days"] >= min_user_days:
+            quests.append({"game_name": game, "quest_id": quest_id, "quest_name": quest_name, **summary})
+    quests.sort(key=lambda row: (row["top1_share_pct"] or 0, row["p99"]), reverse=True)
+    return quests
+
+
+def register(mcp):
+    """
+    Register distribution tools with the MCP server.
+
+    Tools registered:
+    - completion_distribution: Per-quest completions-per-user percentiles and top-1% share
+    """
+
+    @mcp.tool()
+    def completion_distribution(days: int = 7, game_name: str = "", population: str = "all",
+                                min_user_days: int = 20, caller: str = "") -> str:
+        """
+        Completions-per-user distribution per quest from the stored daily histograms.
+
+        Shows what the mean hides: p50/p90/p99 and the share of completions
+        made by the top 1% of users. A high p99 or top-1% share with a modest
+        mean means a few grinders, not broad engagement. Only days not yet
+        stored are scanned in BigQuery; days from the last week, whose bot
+        labels can still change, are rescanned every 15 minutes.
+
+        Args:
+            days: Number of complete days to include (default: 7)
+            game_name: Optional game to filter to (case-insensitive)
+            population: "all" (default), "human" or "bot"
+            min_user_days: Skip quests with fewer user-days than this (default: 20)
+            caller: Name of the prompt this call is for (e.g. "quest_farming_analysis"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON list of quests with user_days, completions, mean, p50, p90,
+            p99, max and top1_share_pct, most concentrated first.
+            Statistics are over user-days (completions per user per day).
+        """
+        try:
+            rows = quest_distributions(store.complete_days(days), game_name or None, population, min_user_days,
+                                       caller or None)
+            return json.dumps(rows, indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
@@ -0,0 +1,49 @@
+-- Event Mirror: Visitor-filtered, bot-labelled quest completion events for the local Parquet mirror
+-- Feeds mirror.py: one Parquet file per day, re-exported only when the day's fingerprint changes
+-- Rows hold ids only: quest, game, tier and AM attributes (and the Maintenance tier filter)
+-- are joined locally from the dimension index at query time, so dimension changes never
+-- need a re-export. Bots are kept and labelled (is_bot, bot_score)
+-- Use parameterized query: @start_date (inclusive) and @end_date (exclusive)
+
+-- QUERY 1: Day Fingerprints
+-- Row count and order-independent hash per day; a recent day is re-exported only when these change
+SELECT 
+  DATE(e.event_ts) as day,
+  COUNT(*) as row_count,
+  BIT_XOR(FARM_FINGERPRINT(CONCAT(
+    CAST(e.visitor_id AS STRING), '|', CAST(v.user_id AS STRING), '|', CAST(e.quest_id AS STRING), '|',
+    CAST(e.event_ts AS STRING), '|', CAST(COALESCE(s.bot_score, -1) AS STRING)
+  ))) as fingerprint
+FROM `app_immutable_play.event` e
+INNER JOIN `app_immutable_play.visitor` v ON e.visitor_id = v.visitor_id
+LEFT JOIN `app_immutable_play.quest` q ON e.quest_id = q.quest_id
+LEFT JOIN `app_immutable_play.game` g ON q.game_id = g.game_id
+LEFT JOIN `mod_imx.sybil_score` s ON v.user_id = s.user_id
+WHERE 
+  e.event_ts >= TIMESTAMP(@start_date)
+  AND e.event_ts < TIMESTAMP(@end_date)
+  AND v.is_front_end_cohort = TRUE
+  AND (v.is_immutable_employee = FALSE OR v.is_immutable_employee IS NULL)
+  AND g.game_name NOT IN ('Guild of Guardians', 'Gods Unchained')
+GROUP BY day;
+
+-- QUERY 2: Events
+-- One row per quest completion, with visitor and sybil_score columns
+SELECT 
+  e.event_ts,
+  CAST(e.visitor_id AS STRING) as visitor_id,
+  CAST(v.user_id AS STRING) as user_id,
+  CAST(e.quest_id AS STRING) as quest_id,
+  CAST(s.bot_score AS FLOAT64) as bot_score,
+  COALESCE(s.bot_score = 1, FALSE) as is_bot
+FROM `app_immutable_play.event` e
+INNER JOIN `app_immutable_play.visitor` v ON e.visitor_id = v.visitor_id
+LEFT JOIN `app_immutable_play.quest` q ON e.quest_id = q.quest_id
+LEFT JOIN `app_immutable_play.game` g ON q.game_id = g.game_id
+LEFT JOIN `mod_imx.sybil_score` s ON v.user_id = s.user_id
+WHERE 
+  e.event_ts >= TIMESTAMP(@start_date)
+  AND e.event_ts < TIMESTAMP(@end_date)
+  AND v.is_front_end_cohort = TRUE
+  AND (v.is_immutable_employee = FALSE OR v.is_immutable_employee IS NULL)
+  AND g.game_name NOT IN ('Guild of Guardians', 'Gods Unchained');
@@ -0,0 +1,284 @@
+"""
+Fake BigQuery - Simulated warehouse for load testing
+
+Stands in for `google.cloud.bigquery.Client` when the server runs with
+QUESTERS_FAKE_BIGQUERY=1 (see loadtest.py). Queries are not executed: each
+job blocks for a configurable latency and returns synthetic rows shaped
+like the statement's output columns. Multi-statement scripts get one child
+job per statement, listed by list_jobs(parent_job=...). Timestamp columns
+of queries with @start_date / @end_date fall inside that window. BATCH
+priority jobs can be held PENDING for a simulated queue wait first.
+
+Environment:
+- QUESTERS_FAKE_BQ_LATENCY_MS : mean job latency (default 500)
+- QUESTERS_FAKE_BQ_JITTER     : ± fraction of latency, uniform (default 0.5)
+- QUESTERS_FAKE_BQ_ROWS       : rows per generic result (default 200)
+- QUESTERS_FAKE_BQ_GAMES      : number of simulated games (default 40)
+- QUESTERS_FAKE_BQ_BATCH_QUEUE_MS : PENDING time of BATCH priority jobs (default 0)
+"""
+import datetime
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+import pyarrow as pa
+
+LATENCY_MS = float(os.environ.get("QUESTERS_FAKE_BQ_LATENCY_MS", 500))
+JITTER = float(os.environ.get("QUESTERS_FAKE_BQ_JITTER", 0.5))
+RESULT_ROWS = int(os.environ.get("QUESTERS_FAKE_BQ_ROWS", 200))
+GAMES = int(os.environ.get("QUESTERS_FAKE_BQ_GAMES", 40))
+BATCH_QUEUE_MS = float(os.environ.get("QUESTERS_FAKE_BQ_BATCH_QUEUE_MS", 0))
+
+GAME_NAMES = [f"Game {i}" for i in range(GAMES)]
+
+# Output column names: "... as alias" plus bare "g.game_name" / "game_name" references
+_ALIAS = re.compile(r"\bAS\s+(\w+)\s*,?\s*$", re.IGNORECASE | re.MULTILINE)
+_BARE_COLUMN = re.compile(r"^\s*(?:\w+\.)?(\w+)\s*,?\s*$", re.MULTILINE)
+_STATEMENT_END = re.compile(r";\s*$", re.MULTILINE)
+# Comments and string literals (skipped whole), parentheses and words
+_TOKEN = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"|`[^`]*`|[()]|\w+", re.DOTALL)
+
+
+def _script_statements(sql: str) -> list:
+    """Statements of a script (a single statement for ordinary queries)"""
+    statements = []
+    for part in _STATEMENT_END.split(sql):
+        code = "\n".join(line for line in part.splitlines() if not line.strip().startswith("--"))
+        if code.strip():
+            statements.append(part.strip())
+    return statements
+
+
+def _final_select(sql: str) -> str:
+    """
+    Text of the outermost (last top-level) SELECT list.
+
+    SELECTs inside parentheses (CTE bodies, subqueries such as the sampled
+    event table of accuracy='sample') are skipped, as are comments and
+    string literals.
+    """
+    depth, start, end = 0, None, None
+    for token in _TOKEN.finditer(sql):
+        text = token.group(0)
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif depth == 0 and text.upper() == "SELECT":
+            start, end = token.end(), None
+        elif depth == 0 and text.upper() == "FROM" and start is not None and end is None:
+            end = token.start()
+    if start is None:
+        return ""
+    return sql[start:end]
+
+
+def _value(column: str, i: int, rng: random.Random):
+    """Plausible synthetic value for a column name"""
+    if column in ("game_name",):
+        return GAME_NAMES[i % GAMES]
+    if column.endswith("_id"):
+        return f"{column}-{i}"
+    if column.endswith("_name") or column in ("tier", "am", "account_manager", "plan_name", "categories", "alert_flag", "alert_message"):
+        return f"{column} {i % 7}"
+    if column.endswith("_ts") or column.startswith("latest_") or column.startswith("valid_"):
+        return datetime.datetime(2026, 1, 1) + datetime.timedelta(hours=i)
+    if column.endswith("pct") or column.endswith("per_user") or column.endswith("rate_pct"):
+        return round(rng.uniform(0, 100), 1)
+    if column == "alert_priority":
+        return rng.randint(1, 5)
+    return rng.randint(0, 50_000)
+
+
+def _weekly_aggregate_rows(params: dict, rng: random.Random) -> list:
+    """Rows for weekly_aggregates.sql: per-game rows plus one overall row per week"""
+    rows = []
+    week = params["start_date"]
+    while week < params["end_date"]:
+        for game_name in [None] + GAME_NAMES:
+            total = rng.randint(100, 50_000)
+            bots = rng.randint(0, total)
+            rows.append({
+                "week_start": week, "game_name": game_name,
+                "tier": None if game_name is None else "Core", "am": None,
+                "total_users": total, "human_users": total - bots, "bot_users": bots,
+                "quest_count": rng.randint(1, 30),
+            })
+        week += datetime.timedelta(weeks=1)
+    return rows
+
+
+def _day_fingerprint_rows(params: dict) -> list:
+    """Rows for event_mirror.sql Query 1: one stable (row_count, fingerprint) per day"""
+    rows = []
+    day = params["start_date"]
+    while day < params["end_date"]:
+        day_rng = random.Random(day.toordinal())
+        rows.append({"day": day, "row_count": RESULT_ROWS, "fingerprint": day_rng.getrandbits(63)})
+        day += datetime.timedelta(days=1)
+    return rows
+
+
+def _histogram_rows(params: dict, rng: random.Random) -> list:
+    """Rows for completion_histograms.sql: per-(day, quest, bot flag) histograms with integer quest ids"""
+    rows = []
+    day = params["start_date"]
+    while day < params["end_date"]:
+        for quest_id in range(RESULT_ROWS // 10):
+            for is_bot in (False, True):
+                for completions in sorted(rng.sample(range(1, 60), 4)):
+                    rows.append({
+                        "day": day, "game_name": GAME_NAMES[quest_id % GAMES], "quest_id": quest_id,
+                        "quest_name": f"quest_name {quest_id % 7}", "is_bot": is_bot,
+                        "completions_per_user": completions, "users": rng.randint(1, 500) // completions + 1,
+                    })
+        day += datetime.timedelta(days=1)
+    return rows
+
+
+def _rows_for(sql: str, params: dict, rng: random.Random) -> list:
+    """Synthetic result rows for a statement"""
+    if "GROUPING SETS" in sql.upper() and "start_date" in params:
+        return _weekly_aggregate_rows(params, rng)
+    if "FARM_FINGERPRINT" in sql.upper() and "start_date" in params:
+        return _day_fingerprint_rows(params)
+    if "FROM user_days" in sql and "start_date" in params:
+        return _histogram_rows(params, rng)
+
+    select = _final_select(sql)
+    columns = _ALIAS.findall(select) + [c for c in _BARE_COLUMN.findall(select) if not c.isupper()]
+    columns = list(dict.fromkeys(columns)) or ["value"]
+
+    if re.search(r"FROM\s+`app_immutable_play\.game`", sql, re.IGNORECASE):
+        count = GAMES
+    else:
+        count = RESULT_ROWS
+    rows = [{column: _value(column, i, rng) for column in columns} for i in range(count)]
+
+    # Spread timestamps over a @start_date..@end_date window so they fall inside it
+    if "start_date" in params and "end_date" in params:
+        start = datetime.datetime.combine(params["start_date"], datetime.time())
+        span = datetime.datetime.combine(params["end_date"], datetime.time()) - start
+        for i, row in enumerate(rows):
+            for column in row:
+                if column.endswith("_ts"):
+                    row[column] = start + span * i / count
+    return rows
+
+
+class _RowIterator(list):
+    """List of row dicts with the `total_rows` attribute of a RowIterator"""
+
+    @property
+    def total_rows(self):
+        return len(self)
+
+    def to_arrow(self):
+        return pa.Table.from_pylist(self)
+
+
+class QueryJob:
+    """Minimal QueryJob: blocks in result() for the simulated queue wait and latency"""
+
+    def __init__(self, sql: str, job_config=None):
+        params = {}
+        for param in getattr(job_config, "query_parameters", None) or []:
+            params[param.name] = getattr(param, "value", getattr(param, "values", None))
+
+        self.job_id = f"fake_{uuid.uuid4().hex}"
+        self.query = sql
+        self.labels = dict(getattr(job_config, "labels", None) or {})
+        self.created = datetime.datetime.now(datetime.timezone.utc)
+        self.started = self.created
+        self.ended = None
+        self.state = "RUNNING"
+        self.error_result = None
+        self.cache_hit = False
+        self.query_plan = []
+        self.num_child_jobs = 0
+        self.parent_job_id = None
+        self.statement_type = "CREATE_TABLE_AS_SELECT" if sql.lstrip().upper().startswith("CREATE") else "SELECT"
+
+        rng = random.Random(hash(sql) ^ hash(str(sorted(params.items(), key=str))))
+        self._latency = max(0.0, LATENCY_MS * (1 + rng.uniform(-JITTER, JITTER))) / 1000
+        queued = BATCH_QUEUE_MS / 1000 if getattr(job_config, "priority", None) == "BATCH" else 0.0
+        self._start = time.monotonic() + queued
+        self._deadline = self._start + self._latency
+        if queued:
+            self.state = "PENDING"
+        self._rows = _RowIterator(_rows_for(sql, params, rng))
+        self.total_bytes_processed = rng.randint(10**8, 5 * 10**9)
+        self.total_bytes_billed = self.total_bytes_processed
+        self.slot_millis = int(self._latency * 1000 * rng.uniform(5, 50))
+        self._cancelled = threading.Event()
+
+    def reload(self) -> None:
+        self.done()
+
+    def done(self) -> bool:
+        if self.state == "PENDING" and time.monotonic() >= self._start:
+            self.state = "RUNNING"
+        if self.state == "RUNNING" and time.monotonic() >= self._deadline:
+            self.state = "DONE"
+            self.ended = datetime.datetime.now(datetime.timezone.utc)
+        return self.state == "DONE"
+
+    def result(self, timeout: float = None):
+        remaining = self._deadline - time.monotonic()
+        if timeout is not None and remaining > timeout:
+            self._cancelled.wait(timeout)
+            raise TimeoutError(f"Job {self.job_id} did not finish within {timeout}s")
+        if remaining > 0 and self._cancelled.wait(remaining):
+            raise RuntimeError(f"Job {self.job_id} was cancelled")
+        self.done()
+        return self._rows
+
+    def cancel(self) -> bool:
+        if self.state in ("PENDING", "RUNNING"):
+            self.state = "DONE"
+            self.error_result = {"reason": "stopped", "message": "Job cancelled"}
+            self.ended = datetime.datetime.now(datetime.timezone.utc)
+            self._cancelled.set()
+        return True
+
+
+class Client:
+    """Drop-in for bigquery.Client covering the calls this server makes"""
+
+    project = "fake-project"
+
+    def __init__(self, *args, **kwargs):
+        self.jobs = {}
+
+    def query(self, sql: str, job_config=None, **kwargs) -> QueryJob:
+        job = QueryJob(sql, job_config)
+        self.jobs[job.job_id] = job
+
+        statements = _script_statements(sql)
+        if len(statements) > 1:
+            job.statement_type = "SCRIPT"
+            job.num_child_jobs = len(statements)
+            for i, statement in enumerate(statements, start=1):
+                child = QueryJob(statement, job_config)
+                child.parent_job_id = job.job_id
+                child.created = job.created + datetime.timedelta(microseconds=i)
+                child._deadline = job._deadline
+                self.jobs[child.job_id] = child
+        return job
+
+    def list_jobs(self, parent_job=None, **kwargs) -> list:
+        """Jobs (children of `parent_job` if given), most recently created first"""
+        parent_id = getattr(parent_job, "job_id", parent_job)
+        jobs = [job for job in self.jobs.values() if parent_id is None or job.parent_job_id == parent_id]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def get_job(self, job_id: str, **kwargs) -> QueryJob:
+        return self.jobs[job_id]
+
+    def cancel_job(self, job_id: str, **kwargs) -> QueryJob:
+        job = self.jobs[job_id]
+        job.cancel()
+        return job
@@ -0,0 +1,25 @@
+-- Job Costs: Bytes, slot time and latency of this server's jobs, by label
+-- Feeds the cost_report tool (costs.py); jobs are labelled app=questers with
+-- phase / statement / caller / session by tools.submit_query
+-- Use parameterized query: @days (INT64) - how far back to look
+-- The region qualifier is replaced with QUESTERS_BQ_REGION when set
+
+SELECT 
+  DATE_TRUNC(DATE(j.creation_time), WEEK(MONDAY)) as week_start,
+  (SELECT value FROM UNNEST(j.labels) WHERE key = 'phase') as phase,
+  (SELECT value FROM UNNEST(j.labels) WHERE key = 'statement') as statement,
+  (SELECT value FROM UNNEST(j.labels) WHERE key = 'caller') as caller,
+  COUNT(*) as jobs,
+  SUM(j.total_bytes_processed) as bytes_processed,
+  SUM(j.total_bytes_billed) as bytes_billed,
+  SUM(j.total_slot_ms) as slot_ms,
+  SUM(TIMESTAMP_DIFF(j.end_time, j.creation_time, MILLISECOND)) as elapsed_ms,
+  COUNTIF(j.cache_hit) as cache_hits
+FROM `region-us`.INFORMATION_SCHEMA.JOBS j
+WHERE 
+  j.creation_time >= TIMESTAMP(DATE_SUB(CURRENT_DATE(), INTERVAL @days DAY))
+  AND j.job_type = 'QUERY'
+  AND j.state = 'DONE'
+  AND j.parent_job_id IS NULL  -- script totals already include their child jobs
+  AND EXISTS (SELECT 1 FROM UNNEST(j.labels) WHERE key = 'app' AND value = 'questers')
+GROUP BY week_start, phase, statement, caller;
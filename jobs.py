@@ -0,0 +1,283 @@
+"""
+Jobs - Per-session BigQuery job tracking, cancellation and late collection
+
+Every job this server submits is tracked until its rows are fetched. That
+makes three things possible:
+- A query that outlives QUERY_TIMEOUT keeps its job; query_bigquery returns
+  the job id and collect_query picks the rows up later instead of re-running.
+- Jobs can be cancelled through the jobs API: explicitly (cancel_query), when
+  a newer query replaces them, and for all outstanding jobs when the client
+  disconnects.
+- Re-asking a query whose job is still running, or finished without its rows
+  being collected, uses that job instead of re-running the query.
+
+A session is one client connection: the stdio client, or each SSE client of
+a shared server. Jobs submitted outside a connection (background prefetches,
+scripts) belong to the process session SESSION_ID. Supersession, cancel_query,
+collect_query and disconnect cleanup only touch the calling session's jobs;
+ids the session did not submit are refused.
+"""
+import asyncio
+import atexit
+import contextvars
+import json
+import signal
+import sys
+import threading
+import time
+import uuid
+
+import approximate
+import results
+import tools
+
+SESSION_ID = uuid.uuid4().hex[:12]  # process session: work not tied to a client connection
+
+_session = contextvars.ContextVar("questers_session", default=SESSION_ID)
+_lock = threading.Lock()
+_jobs = {}  # job_id -> {"job": QueryJob, "session": ..., "key": ..., "statement": ..., "accuracy": ..., "script": ..., "submitted_at": ...}
+
+
+def current_session() -> str:
+    """Id of the client session the calling code runs for"""
+    return _session.get()
+
+
+def track(query_job, key: str = None, statement: str = None, accuracy: str = None, script: str = None) -> None:
+    """
+    Track a submitted job.
+
+    `key` is its result-store key, `statement` its phase statement,
+    `accuracy` the mode it was rewritten for and `script` the phase of a
+    phase script job, so collect() returns its rows the way the original
+    request would have.
+    """
+    with _lock:
+        entry = _jobs.setdefault(query_job.job_id, {"job": query_job, "session": current_session(),
+                                                    "submitted_at": time.time()})
+        if key is not None:
+            entry["key"] = key
+        if statement is not None:
+            entry["statement"] = statement
+        if accuracy is not None:
+            entry["accuracy"] = accuracy
+        if script is not None:
+            entry["script"] = script
+
+
+def forget(job_id: str) -> None:
+    """Stop tracking a job whose rows were fetched (or that failed)"""
+    with _lock:
+        _jobs.pop(job_id, None)
+
+
+def _owned(job_id: str, session: str = None) -> dict:
+    """
+    Tracking entry of a job submitted by the session (default: the current one).
+
+    Raises ValueError for any other id (untracked, or another session's), so
+    no client can cancel or collect jobs it did not submit.
+    """
+    with _lock:
+        entry = _jobs.get(job_id)
+    if entry is None or entry["session"] != (session or current_session()):
+        raise ValueError(f"Job {job_id} is not an outstanding job of this session")
+    return dict(entry)
+
+
+def uncollected(key: str):
+    """
+    A tracked job for a result-store key whose rows have not been fetched yet, or None.
+
+    Covers jobs still running and jobs that finished after their caller timed
+    out; fetching the rows (tools.fetch_rows) stops tracking them. Failed jobs
+    are dropped.
+    """
+    session = current_session()
+    with _lock:
+        candidates = [
+            (job_id, entry["job"]) for job_id, entry in _jobs.items()
+            if entry.get("key") == key and entry["session"] == session
+        ]
+    for job_id, query_job in candidates:
+        if not query_job.done() or not query_job.error_result:
+            return query_job
+        forget(job_id)
+    return None
+
+
+def collect(job_id: str):
+    """
+    Rows of one of this session's jobs that outlived its caller, or None
+    while it is still running.
+
+    Approx and sample jobs come back annotated with their error bound (sample
+    counts scaled), as query_bigquery would have returned them; exact rows
+    with a result-store key are stored. Phase scripts return their child
+    jobs' result sets, as run_phase_script would have.
+    """
+    entry = _owned(job_id)
+    query_job = entry["job"]
+    if not query_job.done():
+        return None
+    if entry.get("script"):
+        return tools.phase_results(entry["script"], tools.script_results(query_job))
+    rows = tools.fetch_rows(query_job)
+    accuracy = entry.get("accuracy", "exact")
+    if accuracy != "exact":
+        return approximate.annotate(rows, accuracy, entry.get("statement"))
+    if entry.get("key"):
+        results.put(entry["key"], rows)
+    return rows
+
+
+def cancel(job_id: str, session: str = None) -> bool:
+    """
+    Cancel one of the session's jobs through the jobs API; False if it had
+    already finished.
+
+    Raises ValueError for a job the session does not track.
+    """
+    query_job = _owned(job_id, session)["job"]
+    forget(job_id)
+    if query_job.done():
+        return False
+    tools.bq_client.cancel_job(job_id)
+    return True
+
+
+def supersede(statement: str, newer_job_id: str) -> list:
+    """Cancel this session's running jobs of the same phase statement that a newer job replaces"""
+    if not statement:
+        return []
+    session = current_session()
+    with _lock:
+        older = [
+            job_id for job_id, entry in _jobs.items()
+            if entry.get("statement") == statement and entry["session"] == session and job_id != newer_job_id
+        ]
+    cancelled = []
+    for job_id in older:
+        try:
+            if cancel(job_id):
+                cancelled.append(job_id)
+        except ValueError:
+            pass  # collected in the meantime
+    return cancelled
+
+
+def cancel_all(session: str = None, all_sessions: bool = False) -> list:
+    """Cancel every outstanding job of a session (default: the current one), or of every session"""
+    session = session or current_session()
+    with _lock:
+        owned = [(job_id, entry["session"]) for job_id, entry in _jobs.items()
+                 if all_sessions or entry["session"] == session]
+    cancelled = []
+    for job_id, owner in owned:
+        try:
+            if cancel(job_id, owner):
+                cancelled.append(job_id)
+        except Exception:
+            pass  # best effort: the client or process may be going away
+    return cancelled
+
+
+def outstanding() -> list:
+    """Summary of this session's tracked jobs"""
+    session = current_session()
+    with _lock:
+        entries = [(job_id, entry) for job_id, entry in _jobs.items() if entry["session"] == session]
+    return [
+        {
+            "job_id": job_id,
+            "state": "DONE" if entry["job"].done() else "RUNNING",
+            "statement": entry.get("statement"),
+            "age_s": int(time.time() - entry["submitted_at"]),
+        }
+        for job_id, entry in entries
+    ]
+
+
+def install_cleanup(mcp) -> None:
+    """
+    Give each client connection its own session, cancel its outstanding jobs
+    when it disconnects, and cancel every job when the server exits (Ctrl-C or
+    SIGTERM).
+
+    FastMCP has no connection hooks, so the low-level server's run() (one call
+    per stdio or SSE connection) is wrapped; requests are handled inside it
+    and see the connection's session.
+    """
+    server = mcp._mcp_server
+    run_connection = server.run
+
+    async def run_session(*args, **kwargs):
+        session = uuid.uuid4().hex[:12]
+        token = _session.set(session)
+        try:
+            return await run_connection(*args, **kwargs)
+        finally:
+            _session.reset(token)
+            await asyncio.get_running_loop().run_in_executor(None, cancel_all, session)
+
+    server.run = run_session
+    atexit.register(cancel_all, all_sessions=True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+
+def register(mcp):
+    """
+    Register job-control tools with the MCP server.
+
+    Tools registered:
+    - cancel_query: Cancel one running query (or all of this session's)
+    - collect_query: Fetch the rows of a query that timed out, or list outstanding queries
+    """
+
+    @mcp.tool()
+    def cancel_query(job_id: str = "") -> str:
+        """
+        Cancel a running BigQuery job so it stops billing.
+
+        Args:
+            job_id: Job id returned by a timed-out query_bigquery call.
+                    Empty cancels every outstanding job of this session.
+
+        Returns:
+            JSON with the cancelled job ids
+        """
+        try:
+            if job_id:
+                cancelled = [job_id] if cancel(job_id) else []
+            else:
+                cancelled = cancel_all()
+            return json.dumps({"session": current_session(), "cancelled": cancelled}, indent=2)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
+
+    @mcp.tool()
+    def collect_query(job_id: str = "") -> str:
+        """
+        Collect the rows of a query that outlived the query timeout.
+
+        The job kept running after query_bigquery (or run_phase_script) returned its job id; this
+        returns its rows once it has finished (no re-run).
+
+        Args:
+            job_id: Job id from the timed-out query_bigquery or run_phase_script response.
+                    Empty lists this session's outstanding jobs.
+
+        Returns:
+            JSON rows if the job has finished (approx/sample queries with their
+            error bound, as query_bigquery returns them), {"status": "running", ...} if not
+        """
+        try:
+            if not job_id:
+                return json.dumps({"session": current_session(), "jobs": outstanding()}, indent=2)
+
+            rows = collect(job_id)
+            if rows is None:
+                return json.dumps({"status": "running", "job_id": job_id}, indent=2)
+            return json.dumps(rows, indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
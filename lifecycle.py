@@ -0,0 +1,211 @@
+"""
+Lifecycle - Quest availability from validity intervals (no event scan)
+
+Phase 1 Query 2 and Phase 2 count "quests available" as COUNT(DISTINCT
+q.quest_id) over events, and "was this quest just added / about to expire?"
+needs another query. Each quest is live over [valid_from, valid_to), so both
+are interval lookups over the quest rows already held by the dimension index
+(dimensions.py, refreshed incrementally by create_ts).
+
+Per game, quests are kept sorted by valid_from and by valid_to; lookups
+bisect those lists. Note the event-based count only sees quests with at
+least one completion, so it can be lower than the live count.
+"""
+import bisect
+import datetime
+import json
+import threading
+
+import aggregates
+import dimensions
+
+EXCLUDED_GAMES = ("Guild of Guardians", "Gods Unchained")
+
+_lock = threading.Lock()
+_lifecycle = {"version": None, "games": {}, "by_game": {}}
+
+
+def _build(games: dict, quests: dict) -> dict:
+    """Per-game quest intervals sorted by start and by end"""
+    by_game = {}
+    for quest in quests.values():
+        valid_from = dimensions.parse_ts(quest["valid_from"]) or dimensions.parse_ts(quest["create_ts"])
+        if valid_from is None:
+            continue
+        entry = {
+            "quest_id": quest["quest_id"],
+            "quest_name": quest["quest_name"],
+            "categories": quest["categories"] or [],
+            "valid_from": valid_from,
+            "valid_to": dimensions.parse_ts(quest["valid_to"]),  # None = open-ended
+        }
+        by_game.setdefault(quest["game_id"], []).append(entry)
+
+    index = {}
+    for game_id, entries in by_game.items():
+        by_start = sorted(entries, key=lambda q: q["valid_from"])
+        by_end = sorted((q for q in entries if q["valid_to"]), key=lambda q: q["valid_to"])
+        index[game_id] = {
+            "by_start": by_start,
+            "starts": [q["valid_from"] for q in by_start],
+            "by_end": by_end,
+            "ends": [q["valid_to"] for q in by_end],
+        }
+    return index
+
+
+def _index() -> tuple:
+    """(games, per-game intervals), rebuilt only when the dimension index changed"""
+    version, games, quests = dimensions.snapshot()
+    with _lock:
+        if _lifecycle["version"] != version:
+            _lifecycle.update(version=version, games=games, by_game=_build(games, quests))
+        return _lifecycle["games"], _lifecycle["by_game"]
+
+
+def _matches(quest: dict, category: str) -> bool:
+    return not category or any(category in (c or "") for c in quest["categories"])
+
+
+def live(intervals: dict, start: datetime.datetime, end: datetime.datetime, category: str = "") -> list:
+    """Quests live at any point in [start, end)"""
+    candidates = intervals["by_start"][:bisect.bisect_left(intervals["starts"], end)]
+    return [q for q in candidates if (q["valid_to"] is None or q["valid_to"] > start) and _matches(q, category)]
+
+
+def starting(intervals: dict, start: datetime.datetime, end: datetime.datetime, category: str = "") -> list:
+    """Quests whose validity starts in [start, end)"""
+    lo, hi = bisect.bisect_left(intervals["starts"], start), bisect.bisect_left(intervals["starts"], end)
+    return [q for q in intervals["by_start"][lo:hi] if _matches(q, category)]
+
+
+def ending(intervals: dict, start: datetime.datetime, end: datetime.datetime, category: str = "") -> list:
+    """Quests whose validity ends in [start, end)"""
+    lo, hi = bisect.bisect_left(intervals["ends"], start), bisect.bisect_left(intervals["ends"], end)
+    return [q for q in intervals["by_end"][lo:hi] if _matches(q, category)]
+
+
+def _selected_games(games: dict, game_name: str = None) -> list:
+    """Game ids for one game, or every game passing the required filters"""
+    if game_name:
+        return dimensions.resolve_game(game_name)
+    return [
+        game_id for game_id, game in games.items()
+        if game["game_name"] and game["game_name"] not in EXCLUDED_GAMES and game["tier"] != "Maintenance"
+    ]
+
+
+def _week_bounds(week: datetime.date) -> tuple:
+    start = datetime.datetime.combine(week, datetime.time(), tzinfo=datetime.timezone.utc)
+    return start, start + datetime.timedelta(weeks=1)
+
+
+def quests_available(weeks: list, game_name: str = None, category: str = "gameplay") -> dict:
+    """Per-game quests live / added / expired per week, oldest week first"""
+    weeks = sorted(weeks)
+    games, by_game = _index()
+    empty = {"by_start": [], "starts": [], "by_end": [], "ends": []}
+
+    rows = []
+    for game_id in _selected_games(games, game_name):
+        intervals = by_game.get(game_id, empty)
+        bounds = [_week_bounds(week) for week in weeks]
+        rows.append({
+            "game_name": games[game_id]["game_name"],
+            "tier": games[game_id]["tier"],
+            "am": games[game_id]["am"],
+            "live": [len(live(intervals, start, end, category)) for start, end in bounds],
+            "added": [len(starting(intervals, start, end, category)) for start, end in bounds],
+            "expired": [len(ending(intervals, start, end, category)) for start, end in bounds],
+        })
+    rows.sort(key=lambda row: row["live"][-1] if row["live"] else 0, reverse=True)
+    return {"weeks": [week.isoformat() for week in weeks], "category": category or None, "games": rows}
+
+
+def changes_in_week(week: datetime.date, expiring_within_days: int = 7, game_name: str = None,
+                    category: str = "", now: datetime.datetime = None) -> dict:
+    """Quests added and expired in a week, plus quests expiring within N days from now"""
+    games, by_game = _index()
+    start, end = _week_bounds(week)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    horizon = now + datetime.timedelta(days=expiring_within_days)
+
+    def _row(game_id, quest, **extra):
+        return {"game_name": games[game_id]["game_name"], "quest_id": quest["quest_id"],
+                "quest_name": quest["quest_name"], **extra}
+
+    added, expired, expiring = [], [], []
+    for game_id in _selected_games(games, game_name):
+        intervals = by_game.get(game_id)
+        if not intervals:
+            continue
+        added += [_row(game_id, q, valid_from=q["valid_from"]) for q in starting(intervals, start, end, category)]
+        expired += [_row(game_id, q, valid_to=q["valid_to"]) for q in ending(intervals, start, end, category)]
+        expiring += [
+            _row(game_id, q, valid_to=q["valid_to"], days_left=round((q["valid_to"] - now).total_seconds() / 86400, 1))
+            for q in ending(intervals, now, horizon, category)
+        ]
+    expiring.sort(key=lambda row: row["valid_to"])
+
+    return {
+        "week_start": week.isoformat(),
+        "added": added,
+        "expired": expired,
+        "expiring_within_days": expiring_within_days,
+        "expiring": expiring,
+    }
+
+
+def register(mcp):
+    """
+    Register quest lifecycle tools with the MCP server.
+
+    Tools registered:
+    - quests_live: Quests live / added / expired per game per week
+    - quest_changes: Quests added and expired in a week, and quests expiring soon
+    """
+
+    @mcp.tool()
+    def quests_live(weeks: int = 4, game_name: str = "", category: str = "gameplay") -> str:
+        """
+        Quests available per game per week from quest validity dates (no event scan).
+
+        A quest counts as live in a week if [valid_from, valid_to) overlaps it.
+        Use for the "quests available" context in Phase 1 and Phase 2.
+
+        Args:
+            weeks: Number of complete weeks to include (default: 4)
+            game_name: Optional game to filter to (case-insensitive)
+            category: Category substring to match (default "gameplay"; "" for all quests)
+
+        Returns:
+            JSON with per-game live / added / expired quest counts per week, oldest first
+        """
+        try:
+            result = quests_available(aggregates.complete_weeks(weeks), game_name or None, category)
+            return json.dumps(result, indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
+
+    @mcp.tool()
+    def quest_changes(week: str = "", expiring_within_days: int = 7, game_name: str = "",
+                      category: str = "") -> str:
+        """
+        Quests added and expired in a week, and quests about to expire (no event scan).
+
+        Args:
+            week: Any date in the week (YYYY-MM-DD). Defaults to the current week.
+            expiring_within_days: Also list quests whose valid_to is within N days from now (default: 7)
+            game_name: Optional game to filter to (case-insensitive)
+            category: Optional category substring (e.g. "gameplay")
+
+        Returns:
+            JSON with added (valid_from in the week), expired (valid_to in the
+            week) and expiring (valid_to within N days, with days_left) quests
+        """
+        try:
+            week_start = aggregates.parse_week(week) if week else aggregates.week_start(datetime.datetime.utcnow().date())
+            result = changes_in_week(week_start, expiring_within_days, game_name or None, category)
+            return json.dumps(result, indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
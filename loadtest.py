@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Load Test - Concurrent MCP clients against a simulated warehouse
+
+Starts server.py on the SSE transport with the fake BigQuery backend
+(fake_bigquery.py) and drives N simulated clients. Each client replays
+realistic prompt sequences (questers_report, investigate_game, bot_analysis):
+fetch the prompt, read the resources it points at, then call tools with a
+"think time" between steps standing in for the model round trip.
+
+Reports:
+- Throughput (operations and sequences per second)
+- Latency p50 / p95 / p99 / max per operation
+- Server memory growth (RSS from /proc, Linux only)
+- Event-loop stalls: a separate probe session pings the server every
+  --probe-ms; pings slower than --stall-ms mean the loop was blocked
+
+Usage:
+    python3 loadtest.py --clients 10 --duration 60 --latency-ms 800 --rows 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from resources import PHASE1_QUERIES, PHASE3_QUEST_ALERTS_SQL
+
+_SCRIPT_DIR = Path(__file__).parent
+
+# Step kinds: ("prompt", name, args) | ("resource", uri) | ("tool", name, args)
+SCENARIOS = {
+    "questers_report": [
+        ("prompt", "questers_report", {}),
+        ("resource", "questers://context/definitions"),
+        ("resource", "questers://context/decomposition"),
+        ("tool", "run_questers_report", {}),
+        ("resource", "questers://sql/phase3_quest_alerts"),
+        ("tool", "query_bigquery", {"sql": PHASE3_QUEST_ALERTS_SQL}),
+    ],
+    "investigate_game": [
+        ("prompt", "investigate_game", {"game_name": "{game}"}),
+        ("resource", "questers://context/definitions"),
+        ("tool", "game_info", {"game_name": "{game}"}),
+        ("tool", "investigate_games", {"game_names": ["{game}"]}),
+        ("tool", "quest_completions_batch", {"game_names": ["{game}"]}),
+    ],
+    "bot_analysis": [
+        ("prompt", "bot_analysis", {}),
+        ("resource", "questers://context/tables"),
+        ("tool", "query_bigquery", {"sql": PHASE1_QUERIES[2]["sql"]}),
+        ("tool", "query_bigquery", {"sql": PHASE1_QUERIES[3]["sql"]}),
+    ],
+}
+SCENARIO_WEIGHTS = {"questers_report": 0.3, "investigate_game": 0.4, "bot_analysis": 0.3}
+
+
+def _percentile(values: list, pct: float):
+    """Nearest-rank percentile (None for no samples)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _fill(value, game: str):
+    """Substitute {game} placeholders in step arguments"""
+    if isinstance(value, str):
+        return value.replace("{game}", game)
+    if isinstance(value, list):
+        return [_fill(item, game) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, game) for key, item in value.items()}
+    return value
+
+
+def _rss_bytes(pid: int):
+    """Resident memory of a process from /proc (None where unavailable)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port: int, data_dir: str) -> subprocess.Popen:
+    """Start server.py on SSE with the fake warehouse and wait until it accepts connections"""
+    env = {
+        **os.environ,
+        "QUESTERS_TRANSPORT": "sse",
+        # fastmcp reads FASTMCP_* (0.x) or FASTMCP_SERVER_* (2.x) settings
+        "FASTMCP_HOST": "127.0.0.1",
+        "FASTMCP_PORT": str(port),
+        "FASTMCP_LOG_LEVEL": "WARNING",
+        "FASTMCP_SERVER_HOST": "127.0.0.1",
+        "FASTMCP_SERVER_PORT": str(port),
+        "FASTMCP_SERVER_LOG_LEVEL": "WARNING",
+        "QUESTERS_FAKE_BIGQUERY": "1",
+        "QUESTERS_FAKE_BQ_LATENCY_MS": str(args.latency_ms),
+        "QUESTERS_FAKE_BQ_JITTER": str(args.jitter),
+        "QUESTERS_FAKE_BQ_ROWS": str(args.rows),
+        "QUESTERS_FAKE_BQ_GAMES": str(args.games),
+        "QUESTERS_DATA_DIR": data_dir,
+    }
+    server = subprocess.Popen([sys.executable, str(_SCRIPT_DIR / "server.py")], env=env)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server.py exited with code {server.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("server.py did not start listening within 30s")
+
+
+async def _run_step(session: ClientSession, step: tuple, game: str):
+    kind = step[0]
+    if kind == "prompt":
+        return await session.get_prompt(step[1], _fill(step[2], game))
+    if kind == "resource":
+        return await session.read_resource(step[1])
+    return await session.call_tool(step[1], _fill(step[2], game))
+
+
+async def simulated_client(url: str, client_id: int, deadline: float, args, stats: dict):
+    """One client: replay weighted random scenarios until the deadline"""
+    rng = random.Random(args.seed + client_id)
+    names, weights = zip(*SCENARIO_WEIGHTS.items())
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while time.monotonic() < deadline:
+                scenario = rng.choices(names, weights)[0]
+                game = f"Game {rng.randrange(args.games)}"
+                for step in SCENARIOS[scenario]:
+                    op = f"{step[0]}:{step[1]}"
+                    started = time.monotonic()
+                    try:
+                        result = await _run_step(session, step, game)
+                        if getattr(result, "isError", False):
+                            stats["errors"][op] = stats["errors"].get(op, 0) + 1
+                    except Exception as e:
+                        stats["errors"][op] = stats["errors"].get(op, 0) + 1
+                        stats["last_error"] = f"{op}: {e}"
+                    stats["latencies"].setdefault(op, []).append(time.monotonic() - started)
+                    await asyncio.sleep(args.think_ms / 1000)
+                stats["sequences"][scenario] = stats["sequences"].get(scenario, 0) + 1
+
+
+async def stall_probe(url: str, deadline: float, args, stats: dict):
+    """Ping the server on its own session; slow pings mean a blocked event loop"""
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                await session.send_ping()
+                stats["pings"].append(time.monotonic() - started)
+                await asyncio.sleep(args.probe_ms / 1000)
+
+
+async def memory_sampler(pid: int, deadline: float, stats: dict):
+    while time.monotonic() < deadline:
+        rss = _rss_bytes(pid)
+        if rss is not None:
+            stats["rss"].append(rss)
+        await asyncio.sleep(1)
+
+
+async def run_load(args, url: str, server_pid: int) -> dict:
+    stats = {"latencies": {}, "errors": {}, "sequences": {}, "pings": [], "rss": [], "last_error": None}
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(
+        stall_probe(url, deadline, args, stats),
+        memory_sampler(server_pid, deadline, stats),
+        *(simulated_client(url, i, deadline, args, stats) for i in range(args.clients)),
+    )
+    return summarize(stats, time.monotonic() - started, args)
+
+
+def summarize(stats: dict, elapsed: float, args) -> dict:
+    operations = {}
+    for op, samples in sorted(stats["latencies"].items()):
+        ms = [s * 1000 for s in samples]
+        operations[op] = {
+            "count": len(ms),
+            "errors": stats["errors"].get(op, 0),
+            "p50_ms": round(_percentile(ms, 50), 1),
+            "p95_ms": round(_percentile(ms, 95), 1),
+            "p99_ms": round(_percentile(ms, 99), 1),
+            "max_ms": round(max(ms), 1),
+        }
+
+    pings_ms = [p * 1000 for p in stats["pings"]]
+    stalls = [p for p in pings_ms if p > args.stall_ms]
+    total_ops = sum(op["count"] for op in operations.values())
+    rss = stats["rss"]
+    return {
+        "config": {
+            "clients": args.clients, "duration_s": args.duration, "latency_ms": args.latency_ms,
+            "jitter": args.jitter, "rows": args.rows, "think_ms": args.think_ms,
+        },
+        "throughput": {
+            "elapsed_s": round(elapsed, 1),
+            "operations": total_ops,
+            "ops_per_s": round(total_ops / elapsed, 2),
+            "sequences": stats["sequences"],
+            "sequences_per_s": round(sum(stats["sequences"].values()) / elapsed, 3),
+        },
+        "operations": operations,
+        "memory": {
+            "rss_start_mb": round(rss[0] / 2**20, 1) if rss else None,
+            "rss_peak_mb": round(max(rss) / 2**20, 1) if rss else None,
+            "rss_end_mb": round(rss[-1] / 2**20, 1) if rss else None,
+            "growth_mb": round((rss[-1] - rss[0]) / 2**20, 1) if rss else None,
+        },
+        "event_loop": {
+            "pings": len(pings_ms),
+            "ping_p50_ms": round(_percentile(pings_ms, 50), 1) if pings_ms else None,
+            "ping_p99_ms": round(_percentile(pings_ms, 99), 1) if pings_ms else None,
+            "ping_max_ms": round(max(pings_ms), 1) if pings_ms else None,
+            "stalls": len(stalls),
+            "stall_threshold_ms": args.stall_ms,
+            "stalled_ms_total": round(sum(stalls), 1),
+        },
+        "last_error": stats["last_error"],
+    }
+
+
+def print_report(report: dict) -> None:
+    t = report["throughput"]
+    print(f"\nThroughput: {t['ops_per_s']} ops/s, {t['sequences_per_s']} sequences/s "
+          f"({t['operations']} ops in {t['elapsed_s']}s)")
+    print(f"\n{'Operation':<42} {'Count':>6} {'Err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for op, s in report["operations"].items():
+        print(f"{op:<42} {s['count']:>6} {s['errors']:>4} {s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8} {s['max_ms']:>8}")
+    m = report["memory"]
+    print(f"\nMemory (RSS MB): start {m['rss_start_mb']}, peak {m['rss_peak_mb']}, end {m['rss_end_mb']}, growth {m['growth_mb']}")
+    e = report["event_loop"]
+    print(f"Event loop: {e['stalls']} stalls > {e['stall_threshold_ms']} ms "
+          f"(ping p50 {e['ping_p50_ms']} ms, p99 {e['ping_p99_ms']} ms, max {e['ping_max_ms']} ms)")
+    if report["last_error"]:
+        print(f"Last error: {report['last_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the questers MCP server against a simulated warehouse")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=60, help="Test duration in seconds")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Mean simulated query latency")
+    parser.add_argument("--jitter", type=float, default=0.5, help="± fraction of latency")
+    parser.add_argument("--rows", type=int, default=200, help="Rows per simulated result")
+    parser.add_argument("--games", type=int, default=40, help="Simulated games")
+    parser.add_argument("--think-ms", type=float, default=200, help="Pause between steps (model round trip)")
+    parser.add_argument("--probe-ms", type=float, default=100, help="Event-loop ping interval")
+    parser.add_argument("--stall-ms", type=float, default=100, help="Ping latency counted as a stall")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as data_dir:
+        server = start_server(args, port, data_dir)
+        try:
+            report = asyncio.run(run_load(args, f"http://127.0.0.1:{port}/sse", server.pid))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
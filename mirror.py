@@ -0,0 +1,292 @@
+"""
+Mirror - Local day-partitioned Parquet mirror of filtered gameplay events
+
+Deep-dive follow-ups keep re-querying the same recent slice of
+app_immutable_play.event. mirror_sync exports that slice, with the visitor
+filters applied and bots labelled (is_bot, bot_score), into one zstd Parquet
+file per complete day (event_mirror.sql Query 2). Day files hold ids only:
+quest, game, tier and AM attributes, and the Maintenance tier filter, are
+joined at query time from the dimension index (dimensions.py), so dimension
+changes never need a re-export.
+
+Days are synced incrementally. Missing days are exported; only the last
+RECHECK_DAYS days, where late events and sybil score updates still land, are
+fingerprinted (Query 1: per-day row count and hash) and re-exported when
+changed. Older days are treated as final.
+
+query_local runs SQL over the memory-mapped day files with DuckDB, with file
+and network access disabled, so investigative queries over the last 30-90
+days do not touch BigQuery. Days older than MIRROR_MAX_DAYS (or the largest
+window synced) are pruned.
+"""
+import datetime
+import json
+import threading
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import dimensions
+import store
+import tools
+from resources import EVENT_MIRROR_QUERIES
+
+TABLE = "event_mirror"
+FINGERPRINT_TABLE = "event_mirror_fingerprints"
+FINGERPRINT_KEY = "days"
+MIRROR_MAX_DAYS = 90
+RECHECK_DAYS = store.SETTLE_DAYS  # days that can still change; older days are final
+EXPORT_CHUNK_DAYS = 7  # days per export job, so one job stays well within QUERY_TIMEOUT
+
+FINGERPRINTS_SQL = EVENT_MIRROR_QUERIES[1]["sql"]
+EVENTS_SQL = EVENT_MIRROR_QUERIES[2]["sql"]
+
+SCHEMA = pa.schema([
+    ("event_ts", pa.timestamp("us", tz="UTC")),
+    ("visitor_id", pa.string()),
+    ("user_id", pa.string()),
+    ("quest_id", pa.string()),
+    ("bot_score", pa.float64()),
+    ("is_bot", pa.bool_()),
+])
+
+FINGERPRINT_SCHEMA = pa.schema([
+    ("day", pa.string()),
+    ("row_count", pa.int64()),
+    ("fingerprint", pa.int64()),
+])
+
+QUEST_SCHEMA = pa.schema([
+    ("quest_id", pa.string()),
+    ("quest_name", pa.string()),
+    ("categories", pa.string()),
+    ("game_id", pa.string()),
+])
+
+GAME_SCHEMA = pa.schema([
+    ("game_id", pa.string()),
+    ("game_name", pa.string()),
+    ("tier", pa.string()),
+    ("am", pa.string()),
+])
+
+# The table queries see: mirrored events joined with the dimension index,
+# with the game-side required filters applied
+EVENTS_VIEW = """
+CREATE VIEW events AS
+SELECT r.event_ts, r.visitor_id, r.user_id, r.quest_id, q.quest_name, q.categories,
+       q.game_id, g.game_name, g.tier, g.am, r.bot_score, r.is_bot
+FROM raw_events r
+JOIN quests q ON r.quest_id = q.quest_id
+JOIN games g ON q.game_id = g.game_id
+WHERE g.game_name NOT IN ('Guild of Guardians', 'Gods Unchained')
+  AND g.tier != 'Maintenance'
+"""
+
+_sync_lock = threading.Lock()
+
+
+def _export(start: datetime.date, end: datetime.date, caller: str) -> int:
+    """Export [start, end) and write one partition per day (empty days included). Returns rows written."""
+    query_job = tools.submit_query(EVENTS_SQL, {"start_date": start, "end_date": end}, caller=caller)
+    data = tools.fetch_arrow(query_job).select(SCHEMA.names).cast(SCHEMA)
+    event_days = pc.cast(data["event_ts"], pa.date32())
+
+    day = start
+    while day < end:
+        store.write_table(TABLE, day.isoformat(), data.filter(pc.equal(event_days, pa.scalar(day, pa.date32()))))
+        day += datetime.timedelta(days=1)
+    return data.num_rows
+
+
+def _fingerprints(days: list, caller: str) -> dict:
+    """Current {day: fingerprint row} for a sorted run of days (days without events get a zero row)"""
+    rows = tools.run_query(FINGERPRINTS_SQL, {"start_date": days[0], "end_date": days[-1] + datetime.timedelta(days=1)},
+                           caller=caller)
+    remote = {day.isoformat(): {"day": day.isoformat(), "row_count": 0, "fingerprint": 0} for day in days}
+    for row in rows:
+        remote[str(row["day"])] = {"day": str(row["day"]), "row_count": row["row_count"], "fingerprint": row["fingerprint"]}
+    return remote
+
+
+def sync(days: int = 30, caller: str = None) -> dict:
+    """
+    Bring the last `days` complete days of the mirror up to date.
+
+    Days missing locally are exported. Of the days already mirrored, only
+    the last RECHECK_DAYS are fingerprinted, and re-exported if they changed.
+    """
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    caller = caller or "mirror"
+    window = sorted(store.complete_days(days))
+    recent = window[-RECHECK_DAYS:]
+
+    with _sync_lock:
+        stored = {row["day"]: row for row in store.read_partition(FINGERPRINT_TABLE, FINGERPRINT_KEY)}
+        remote = _fingerprints(recent, caller)
+
+        stale = [day for day in window if not store.has_partition(TABLE, day.isoformat())]
+        changed = [
+            day for day in recent
+            if store.has_partition(TABLE, day.isoformat()) and stored.get(day.isoformat()) != remote[day.isoformat()]
+        ]
+        stale = sorted(stale + changed)
+
+        rows_exported = 0
+        for start, end in store.contiguous_runs(stale, datetime.timedelta(days=1), EXPORT_CHUNK_DAYS):
+            rows_exported += _export(start, end, caller)
+            day = start
+            while day < end:
+                if day.isoformat() in remote:
+                    stored[day.isoformat()] = remote[day.isoformat()]
+                day += datetime.timedelta(days=1)
+            # Record fingerprints after each range so an interrupted sync resumes where it stopped
+            store.write_partition(FINGERPRINT_TABLE, FINGERPRINT_KEY, sorted(stored.values(), key=lambda r: r["day"]),
+                                  FINGERPRINT_SCHEMA)
+
+        cutoff = (datetime.datetime.utcnow().date() - datetime.timedelta(days=max(days, MIRROR_MAX_DAYS))).isoformat()
+        pruned = [key for key in store.list_partitions(TABLE) if key < cutoff]
+        for key in pruned:
+            store.delete_partition(TABLE, key)
+        # Fingerprints are only compared for the last RECHECK_DAYS days, whatever window was synced; drop the rest
+        recheck_from = (datetime.datetime.utcnow().date() - datetime.timedelta(days=RECHECK_DAYS)).isoformat()
+        kept = sorted((row for key, row in stored.items() if key >= recheck_from), key=lambda r: r["day"])
+        if len(kept) != len(stored):
+            store.write_partition(FINGERPRINT_TABLE, FINGERPRINT_KEY, kept, FINGERPRINT_SCHEMA)
+
+    return {
+        "window": [window[0].isoformat(), window[-1].isoformat()],
+        "exported_days": [day.isoformat() for day in stale],
+        "changed_days": [day.isoformat() for day in changed],
+        "unchanged_days": len(window) - len(stale),
+        "rows_exported": rows_exported,
+        "pruned_days": pruned,
+    }
+
+
+def events(days: list, caller: str = None) -> pa.Table:
+    """Mirrored events for the given days as one memory-mapped Table, syncing first if any day is missing"""
+    if any(not store.has_partition(TABLE, day.isoformat()) for day in days):
+        sync((datetime.datetime.utcnow().date() - min(days)).days, caller)
+    return pa.concat_tables([store.read_table(TABLE, day.isoformat()) for day in sorted(days)])
+
+
+def _dimension_tables() -> tuple:
+    """(quests, games) Arrow tables from the dimension index"""
+    _, games, quests = dimensions.snapshot()
+    quest_rows = [
+        {
+            "quest_id": str(quest["quest_id"]),
+            "quest_name": quest["quest_name"],
+            "categories": ", ".join(quest["categories"] or []) if isinstance(quest["categories"], list) else quest["categories"],
+            "game_id": str(quest["game_id"]),
+        }
+        for quest in quests.values()
+    ]
+    game_rows = [
+        {"game_id": str(game["game_id"]), "game_name": game["game_name"], "tier": game["tier"], "am": game["am"]}
+        for game in games.values()
+    ]
+    return pa.Table.from_pylist(quest_rows, schema=QUEST_SCHEMA), pa.Table.from_pylist(game_rows, schema=GAME_SCHEMA)
+
+
+def run_local(sql: str, days: int = 30, caller: str = None) -> dict:
+    """Run DuckDB SQL over the mirrored `events` view for the last `days` complete days"""
+    try:
+        import duckdb
+    except ImportError:
+        raise RuntimeError("Local queries need DuckDB: pip install duckdb")
+    if days < 1:
+        raise ValueError("days must be at least 1")
+
+    window = store.complete_days(days)
+    raw_events = events(window, caller)
+    quests, games = _dimension_tables()
+
+    # Model-written SQL: no file or network access, and settings cannot be changed back
+    connection = duckdb.connect(config={"enable_external_access": False})
+    try:
+        connection.register("raw_events", raw_events)
+        connection.register("quests", quests)
+        connection.register("games", games)
+        connection.execute(EVENTS_VIEW)
+        connection.execute("SET lock_configuration = true")
+        rows = connection.execute(sql).fetch_arrow_table().to_pylist()
+    finally:
+        connection.close()
+
+    synced_at = store.partition_updated_at(FINGERPRINT_TABLE, FINGERPRINT_KEY)
+    return {
+        "window": [min(window).isoformat(), max(window).isoformat()],
+        "synced_at": synced_at.isoformat() if synced_at else None,
+        "row_count": len(rows),
+        "rows": rows,
+    }
+
+
+def register(mcp):
+    """
+    Register local event mirror tools with the MCP server.
+
+    Tools registered:
+    - mirror_sync: Export new or changed days of filtered events to the local Parquet mirror
+    - query_local: Run SQL over the local event mirror (no BigQuery)
+    """
+
+    @mcp.tool()
+    def mirror_sync(days: int = 30, caller: str = "") -> str:
+        """
+        Sync the local event mirror for the last N complete days.
+
+        The mirror holds quest completion events with the required filters
+        applied and bots labelled. Missing days are exported; of the mirrored
+        days, only the last 7 (where late data still lands) are checked and
+        re-exported if their data changed in BigQuery.
+
+        Args:
+            days: Number of complete days to mirror (default: 30, kept up to 90)
+            caller: Name of the prompt this call is for (e.g. "investigate_game"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with the window, exported and changed days, unchanged day
+            count, rows exported and days pruned
+        """
+        try:
+            return json.dumps(sync(days, caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
+
+    @mcp.tool()
+    def query_local(sql: str, days: int = 30, caller: str = "") -> str:
+        """
+        Run SQL over the local event mirror instead of BigQuery (DuckDB dialect).
+
+        Query the table `events`, one row per quest completion with columns:
+        event_ts, visitor_id, user_id, quest_id, quest_name, categories
+        (comma-joined, e.g. categories LIKE '%gameplay%'), game_id, game_name,
+        tier, am, bot_score, is_bot. Required filters are already applied and
+        bots are labelled, not removed. Covers complete days only (not today);
+        missing days are synced from BigQuery first. Files and network are
+        not accessible from the SQL.
+
+        Example:
+            SELECT game_name, COUNT(DISTINCT visitor_id) AS users,
+                   COUNT(DISTINCT CASE WHEN is_bot THEN visitor_id END) AS bots
+            FROM events WHERE categories LIKE '%gameplay%'
+            GROUP BY game_name ORDER BY users DESC
+
+        Args:
+            sql: DuckDB SQL over `events`
+            days: Number of complete days to load (default: 30)
+            caller: Name of the prompt this call is for (e.g. "investigate_game"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with the window, synced_at, row_count and rows
+        """
+        try:
+            return json.dumps(run_local(sql, days, caller or None), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
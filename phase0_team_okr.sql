@@ -30,6 +30,7 @@ WITH last_30d_questers AS (
   LEFT JOIN UNNEST(q.quest_category) AS category
   WHERE 
     e.event_ts >= TIMESTAMP(DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY))
+    AND e.event_ts < TIMESTAMP(DATE_ADD(CURRENT_DATE(), INTERVAL 1 DAY))
     AND v.is_front_end_cohort = TRUE
     AND (v.is_immutable_employee = FALSE OR v.is_immutable_employee IS NULL)
     AND g.game_name NOT IN ('Guild of Guardians', 'Gods Unchained')
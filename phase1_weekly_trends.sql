@@ -77,3 +77,31 @@ WHERE
   AND g.plan_name != 'Maintenance'
 GROUP BY g.game_name, q.quest_name
 ORDER BY bot_pct DESC, completions DESC;
+
+-- QUERY 4: Selected Games Weekly Trend (Last 4 Complete Weeks)
+-- Batch deep dive: one scan for a list of games, grouped by game and week
+-- Use parameterized query: @game_names (ARRAY<STRING>)
+-- Execute with: query_bigquery(sql, {"game_names": ["MetalCore", "Cross The Ages"]})
+SELECT 
+  g.game_name,
+  DATE_TRUNC(DATE(e.event_ts), WEEK(MONDAY)) as week_start,
+  COUNT(DISTINCT e.visitor_id) as gameplay_questers,
+  COUNT(DISTINCT q.quest_id) as gameplay_quests,
+  ROUND(100.0 * COUNT(DISTINCT CASE WHEN s.bot_score = 1 THEN e.visitor_id END) / 
+        NULLIF(COUNT(DISTINCT e.visitor_id), 0), 1) as bot_pct
+FROM `app_immutable_play.event` e
+INNER JOIN `app_immutable_play.visitor` v ON e.visitor_id = v.visitor_id
+LEFT JOIN `app_immutable_play.quest` q ON e.quest_id = q.quest_id
+LEFT JOIN `app_immutable_play.game` g ON q.game_id = g.game_id
+LEFT JOIN UNNEST(q.quest_category) AS category
+LEFT JOIN `mod_imx.sybil_score` s ON v.user_id = s.user_id
+WHERE 
+  e.event_ts >= TIMESTAMP(DATE_SUB(DATE_TRUNC(CURRENT_DATE(), WEEK(MONDAY)), INTERVAL 28 DAY))
+  AND e.event_ts < TIMESTAMP(DATE_TRUNC(CURRENT_DATE(), WEEK(MONDAY)))
+  AND v.is_front_end_cohort = TRUE
+  AND (v.is_immutable_employee = FALSE OR v.is_immutable_employee IS NULL)
+  AND g.game_name IN UNNEST(@game_names)
+  AND g.plan_name != 'Maintenance'
+  AND category LIKE '%gameplay%'
+GROUP BY g.game_name, week_start
+ORDER BY g.game_name, week_start DESC;
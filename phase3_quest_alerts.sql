@@ -123,6 +123,7 @@ SELECT
   game_name,
   plan_name,
   COALESCE(account_manager_name, 'Unassigned') as account_manager,
+  quest_id,
   quest_name,
   categories,
   
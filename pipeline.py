@@ -0,0 +1,235 @@
+"""
+Pipeline - Server-side questers_report (Phases 0-2) as a dependency graph
+
+Instead of the agent reading four resources and sending six or more queries
+one after another, run_questers_report runs every stage on the server:
+
+    phase0 (script) ─┐
+    phase1_farming ──┼──► report
+    aggregates ──► phase2 ──► phase1
+
+Independent stages run in parallel; Phase 0 runs as one script (its 30-day
+quota_status is materialized once for all three queries), and Phase 1 and
+Phase 2 share the per-game weekly aggregates (aggregates.py) instead of
+scanning events again.
+"""
+import concurrent.futures
+import contextvars
+import datetime
+import json
+import time
+
+import aggregates
+from resources import PHASE1_QUERIES, PHASE_SCRIPTS
+from tools import run_query, run_script
+
+MAX_WORKERS = 4
+CALLER = "run_questers_report"  # job label for cost attribution when no prompt is named
+FARMING_TOP_N = 10
+
+
+def run_graph(stages: dict, max_workers: int = MAX_WORKERS) -> tuple:
+    """
+    Run a dependency graph of stages.
+
+    `stages` maps name -> (dependencies, fn); fn receives a dict of its
+    dependencies' results. A stage starts as soon as all its dependencies have
+    finished. Failed stages are recorded in `errors` and their dependents are
+    skipped. Returns (results, errors, timings_ms).
+    """
+    results, errors, timings = {}, {}, {}
+    pending = dict(stages)
+    running = {}
+
+    def _run(name, fn, inputs):
+        started = time.monotonic()
+        try:
+            return fn(inputs)
+        finally:
+            timings[name] = int((time.monotonic() - started) * 1000)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name, (deps, fn) in list(pending.items()):
+                failed = [dep for dep in deps if dep in errors]
+                if failed:
+                    errors[name] = f"Skipped: upstream stage failed ({', '.join(failed)})"
+                    del pending[name]
+                elif all(dep in results for dep in deps):
+                    inputs = {dep: results[dep] for dep in deps}
+                    # Copy the caller's context so stage jobs belong to the caller's session
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, _run, name, fn, inputs)] = name
+                    del pending[name]
+
+            if not running:
+                # Remaining stages depend on something that never ran
+                for name in pending:
+                    errors[name] = "Skipped: unresolved dependencies"
+                break
+
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = str(e)
+    return results, errors, timings
+
+
+def _phase1_games(decomposition: dict) -> list:
+    """Per-game Phase 1 table (Curr / Prev / WoW / Quests / Bot%) from the shared decomposition rows"""
+    return [
+        {
+            "game_name": row["game_name"],
+            "tier": row["tier"],
+            "am": row["am"],
+            "curr": row["curr_users"],
+            "prev": row["prev_users"],
+            "wow": row["delta_total"],
+            "wow_pct": row["pct_change"],
+            "quests": row["curr_quests"],
+            "bot_pct": row["curr_bot_pct"],
+        }
+        for row in sorted(decomposition["games"], key=lambda r: r["curr_users"], reverse=True)
+    ]
+
+
+def _phase2_compact(decomposition: dict) -> dict:
+    """Decomposition tree without the full per-game column set"""
+    games = {}
+    for row in decomposition["games"]:
+        games.setdefault(row["bucket"], []).append({
+            "game_name": row["game_name"],
+            "delta_total": row["delta_total"],
+            "delta_humans": row["delta_humans"],
+            "delta_bots": row["delta_bots"],
+            "prev_bot_pct": row["prev_bot_pct"],
+            "curr_bot_pct": row["curr_bot_pct"],
+        })
+    return {
+        "overall": decomposition["overall"],
+        "buckets": decomposition["buckets"],
+        "games_by_bucket": games,
+        "note": decomposition["note"],
+    }
+
+
+def _farming_flags(rows: list) -> list:
+    """Top Phase 1 Query 3 rows that cross the farming thresholds"""
+    flagged = [
+        row for row in rows
+        if (row.get("bot_pct") or 0) >= 80 or (row.get("completions_per_user") or 0) > 10
+    ]
+    return flagged[:FARMING_TOP_N]
+
+
+def as_of(sql: str) -> str:
+    """Anchor a CURRENT_DATE()-relative phase statement on the @as_of date parameter instead"""
+    return sql.replace("CURRENT_DATE()", "@as_of")
+
+
+def build_stages(curr_week: datetime.date, prev_week: datetime.date, phase0_as_of: datetime.date,
+                 caller: str = CALLER) -> dict:
+    """
+    Stage graph for Phases 0-2 of the weekly questers report.
+
+    Phase 0 covers the 30 days up to and including `phase0_as_of`; farming covers curr_week.
+    """
+    trend_weeks = [curr_week, prev_week, prev_week - datetime.timedelta(weeks=1)]
+    week_end = curr_week + datetime.timedelta(weeks=1)
+    return {
+        "phase0": ([], lambda _: run_script(
+            as_of(PHASE_SCRIPTS["phase0_team_okr"]["sql"]), {"as_of": phase0_as_of},
+            caller=caller, statement="phase0_team_okr#script"
+        )),
+        "phase1_farming": ([], lambda _: _farming_flags(run_query(
+            as_of(PHASE1_QUERIES[3]["sql"]), {"as_of": week_end},
+            caller=caller, statement="phase1_weekly_trends#3"
+        ))),
+        "aggregates": ([], lambda _: aggregates.ensure_weeks(trend_weeks, caller)),
+        "phase2": (["aggregates"], lambda _: aggregates.decompose(curr_week, prev_week, caller)),
+        "phase1": (["aggregates", "phase2"], lambda inputs: {
+            "overall": aggregates.trend_matrix(trend_weeks, caller)["overall"],
+            "games": _phase1_games(inputs["phase2"]),
+        }),
+    }
+
+
+def questers_report(curr_week: datetime.date = None, caller: str = CALLER) -> dict:
+    """
+    Run Phases 0-2 and assemble one compact structured report.
+
+    For the last complete week (default), Phase 0 is the live 30 days to
+    today; for an earlier week it is the 30 days up to that week's Sunday.
+    """
+    latest_week = aggregates.complete_weeks(1)[0]
+    curr_week = curr_week or latest_week
+    prev_week = curr_week - datetime.timedelta(weeks=1)
+    if curr_week == latest_week:
+        phase0_as_of = datetime.datetime.utcnow().date()
+    else:
+        phase0_as_of = curr_week + datetime.timedelta(days=6)
+
+    started = time.monotonic()
+    results, errors, timings = run_graph(build_stages(curr_week, prev_week, phase0_as_of, caller))
+
+    phase0 = None
+    if "phase0" in results:
+        summary, tiers, below_quota = results["phase0"]
+        phase0 = {
+            "summary": (summary or [None])[0],
+            "tiers": tiers,
+            "below_quota": below_quota,
+        }
+
+    return {
+        "curr_week": curr_week.isoformat(),
+        "prev_week": prev_week.isoformat(),
+        "phase0_window": [(phase0_as_of - datetime.timedelta(days=30)).isoformat(), phase0_as_of.isoformat()],
+        "phase0": phase0,
+        "phase1": results.get("phase1"),
+        "phase1_farming": results.get("phase1_farming"),
+        "phase2": _phase2_compact(results["phase2"]) if "phase2" in results else None,
+        "weeks_scanned": [week.isoformat() for week in results.get("aggregates", [])],
+        "errors": errors,
+        "timings_ms": {**timings, "total": int((time.monotonic() - started) * 1000)},
+    }
+
+
+def register(mcp):
+    """
+    Register pipeline tools with the MCP server.
+
+    Tools registered:
+    - run_questers_report: Phases 0-2 of the weekly questers report in one call
+    """
+
+    @mcp.tool()
+    def run_questers_report(curr_week: str = "", caller: str = "") -> str:
+        """
+        Run Phases 0-2 of the weekly questers report on the server in ONE call.
+
+        Stages run as a dependency graph: the Phase 0 script, farming analysis
+        and weekly aggregates in parallel; Phase 1 and Phase 2 reuse the stored
+        per-game weekly aggregates. Phase 3 is NOT included (ask the user first).
+
+        Args:
+            curr_week: Any date in the week to report on (YYYY-MM-DD).
+                       Defaults to the last complete week. For an earlier
+                       week, Phase 0 covers the 30 days up to that week's end
+                       and farming covers that week.
+            caller: Name of the prompt this call is for (e.g. "questers_report"); recorded
+                    as a job label for cost_report
+
+        Returns:
+            JSON with phase0 (summary, tiers, below_quota), phase1 (overall
+            trend, per-game table), phase1_farming (flagged quests), phase2
+            (decomposition tree), per-stage errors and timings
+        """
+        try:
+            week = aggregates.parse_week(curr_week) if curr_week else None
+            return json.dumps(questers_report(week, caller or CALLER), indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
@@ -0,0 +1,123 @@
+"""
+Prefetch - Speculative background runs of predictable follow-up queries
+
+The analysis guide makes many sequences predictable: a WoW question ALWAYS
+runs Phase 1 then Phase 2, Phase 0 is followed by Phase 1, and
+questers_report offers the Phase 3 alert audit right after Phase 2. Phase 0's
+own three queries are not prefetched one by one: each would recompute the
+30-day quota_status CTE, which run_phase_script computes once. When the
+agent submits one of these statements (exact accuracy, no profile), the
+likely next ones start in the background at BATCH (low) priority and land in
+the result store, so the follow-up returns as soon as it is asked.
+
+A prefetch never holds up the request it anticipated: when that request
+arrives first (see claim), a prefetch that has not started is dropped and a
+BATCH job still queued is cancelled, so the query runs interactively. Prefetch
+jobs are tracked under the follow-up's result-store key and the submitting
+session, so one that outlives QUERY_TIMEOUT is reused by the follow-up (or
+cancelled with the session) rather than run twice.
+
+Only parameterless phase statements are prefetched, and each one is dry-run
+first: anything over QUESTERS_PREFETCH_MAX_BYTES (default 5 GB) is skipped.
+Set QUESTERS_PREFETCH=0 to disable.
+"""
+import concurrent.futures
+import contextvars
+import os
+import threading
+
+import jobs
+import results
+import tools
+from resources import PHASE_STATEMENTS, identify_statement
+
+ENABLED = os.environ.get("QUESTERS_PREFETCH", "1") != "0"
+PREFETCH_MAX_BYTES = int(os.environ.get("QUESTERS_PREFETCH_MAX_BYTES", 5_000_000_000))
+
+# Statement just submitted -> statements likely to be asked for next
+FOLLOW_UPS = {
+    "phase0_team_okr#3": ["phase1_weekly_trends#1"],
+    "phase1_weekly_trends#1": ["phase1_weekly_trends#2", "phase2_decomposition#1"],
+    "phase1_weekly_trends#2": ["phase2_decomposition#1", "phase1_weekly_trends#3"],
+    "phase2_decomposition#1": ["phase3_quest_alerts#1"],
+}
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+_lock = threading.Lock()
+_claimed = set()  # keys asked for interactively before their prefetch job was submitted
+
+
+def _run(sql: str, key: str, statement: str, future: concurrent.futures.Future) -> None:
+    """Dry-run against the bytes ceiling, then run at BATCH priority"""
+    if not future.set_running_or_notify_cancel():
+        return  # claimed before it started
+    try:
+        estimate = tools.submit_query(sql, dry_run=True, caller="prefetch").total_bytes_processed or 0
+        if estimate > PREFETCH_MAX_BYTES:
+            raise RuntimeError(f"Prefetch skipped: {estimate:,} bytes exceeds ceiling of {PREFETCH_MAX_BYTES:,}")
+        with _lock:
+            if key in _claimed:
+                raise RuntimeError("Prefetch skipped: the query was asked for interactively")
+            query_job = tools.submit_query(sql, priority="BATCH", maximum_bytes_billed=PREFETCH_MAX_BYTES,
+                                           caller="prefetch", statement=statement)
+            jobs.track(query_job, key=key, statement=statement)
+        future.set_result(tools.fetch_rows(query_job))
+    except Exception as e:
+        future.set_exception(e)
+    finally:
+        with _lock:
+            _claimed.discard(key)
+
+
+def claim(key: str):
+    """
+    Take over a prefetch of `key` for an interactive request.
+
+    Returns the prefetch's future only when its job is already running (or
+    it has finished), so waiting on it is no slower than re-running.
+    Otherwise returns None after making sure the prefetch will not compete:
+    a prefetch that has not started is dropped, one still dry-running will
+    not submit, and a BATCH job still queued is cancelled.
+    """
+    future = results.pending(key)
+    if future is None or future.cancel():
+        return None
+    with _lock:
+        if future.done():
+            return future
+        query_job = jobs.uncollected(key)
+        if query_job is None:
+            _claimed.add(key)
+            return None
+    query_job.reload()
+    if query_job.state == "PENDING":
+        try:
+            jobs.cancel(query_job.job_id)
+        except ValueError:
+            pass  # finished and collected in the meantime
+        return None
+    return future
+
+
+def on_submit(sql: str, parameters: dict = None) -> list:
+    """
+    Start background runs of the likely follow-ups to a submitted statement.
+
+    Returns the statement keys that were started (stored, running or
+    uncollected follow-ups are not started again).
+    """
+    if not ENABLED or parameters:
+        return []
+
+    started = []
+    for follow_up in FOLLOW_UPS.get(identify_statement(sql), []):
+        follow_up_sql = PHASE_STATEMENTS[follow_up]["sql"]
+        key = results.cache_key(follow_up_sql)
+        if jobs.uncollected(key):
+            continue  # an earlier run outlived QUERY_TIMEOUT and is still reusable
+        future = concurrent.futures.Future()
+        if results.track(key, future):
+            # Run in the submitting session so its job is reused or cancelled with that session's
+            _executor.submit(contextvars.copy_context().run, _run, follow_up_sql, key, follow_up, future)
+            started.append(follow_up)
+    return started
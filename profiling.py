@@ -0,0 +1,129 @@
+"""
+Profiling - Stage-level diagnostics for completed BigQuery jobs
+
+Reads `QueryJob.query_plan` and flags the problems our phase SQL is prone to:
+- UNNEST row explosion (quest_category fan-out before the category filter)
+- Join skew (one worker doing most of the work, typically a hot game_id)
+- Large COUNT(DISTINCT ...) aggregation stages
+"""
+
+# Thresholds for flagging a stage
+FANOUT_RATIO = 1.5             # records_written / records_read above this = row explosion
+SKEW_RATIO = 5.0               # max / avg worker time above this = skewed stage
+SKEW_MIN_MS = 1_000            # ignore skew on stages where the slowest worker is fast anyway
+LARGE_DISTINCT_ROWS = 50_000_000  # COUNT(DISTINCT) over more input rows than this is flagged
+
+
+def _ratio(numerator, denominator):
+    """Safe ratio rounded for display (None when undefined)"""
+    if not numerator or not denominator:
+        return None
+    return round(numerator / denominator, 2)
+
+
+def _stage_text(entry) -> str:
+    """All step kinds and substeps of a stage as one lowercase string for pattern matching"""
+    parts = []
+    for step in entry.steps or []:
+        parts.append(step.kind or "")
+        parts.extend(step.substeps or [])
+    return " ".join(parts).lower()
+
+
+def _summarize_stage(entry) -> dict:
+    """Timings, row counts and skew for one plan stage"""
+    duration_ms = None
+    if entry.start and entry.end:
+        duration_ms = int((entry.end - entry.start).total_seconds() * 1000)
+
+    return {
+        "stage": entry.name,
+        "status": entry.status,
+        "duration_ms": duration_ms,
+        "slot_ms": entry.slot_ms,
+        "records_read": entry.records_read,
+        "records_written": entry.records_written,
+        "fanout": _ratio(entry.records_written, entry.records_read),
+        "wait_ms_avg": entry.wait_ms_avg,
+        "wait_ms_max": entry.wait_ms_max,
+        "wait_skew": _ratio(entry.wait_ms_max, entry.wait_ms_avg),
+        "compute_ms_avg": entry.compute_ms_avg,
+        "compute_ms_max": entry.compute_ms_max,
+        "compute_skew": _ratio(entry.compute_ms_max, entry.compute_ms_avg),
+        "shuffle_output_bytes": entry.shuffle_output_bytes,
+        "shuffle_output_bytes_spilled": entry.shuffle_output_bytes_spilled,
+        "steps": [step.kind for step in entry.steps or []],
+    }
+
+
+def _diagnose_stage(entry, stage: dict) -> list:
+    """Known-problem flags for one plan stage"""
+    flags = []
+    text = _stage_text(entry)
+
+    if "unnest" in text and stage["fanout"] and stage["fanout"] > FANOUT_RATIO:
+        flags.append({
+            "stage": stage["stage"],
+            "issue": "UNNEST row explosion",
+            "detail": f"{stage['records_read']:,} rows in → {stage['records_written']:,} out ({stage['fanout']}x)",
+            "suggestion": "Filter categories with EXISTS (SELECT 1 FROM UNNEST(q.quest_category) c WHERE c LIKE '%gameplay%') "
+                          "instead of LEFT JOIN UNNEST, so each event stays one row",
+        })
+
+    skew = max(stage["compute_skew"] or 0, stage["wait_skew"] or 0)
+    slowest_ms = max(stage["compute_ms_max"] or 0, stage["wait_ms_max"] or 0)
+    if "join" in text and skew > SKEW_RATIO and slowest_ms >= SKEW_MIN_MS:
+        key = "game_id" if "game_id" in text else "join key"
+        flags.append({
+            "stage": stage["stage"],
+            "issue": f"Join skew on {key}",
+            "detail": f"slowest worker {skew}x the average ({slowest_ms:,} ms)",
+            "suggestion": "Pre-aggregate events per quest_id/game_id before joining dimensions, "
+                          "or push a game_id filter onto the event scan",
+        })
+
+    if ("count_distinct" in text or "count(distinct" in text) and (stage["records_read"] or 0) >= LARGE_DISTINCT_ROWS:
+        flags.append({
+            "stage": stage["stage"],
+            "issue": "Large COUNT(DISTINCT) stage",
+            "detail": f"{stage['records_read']:,} input rows",
+            "suggestion": "Reuse stored weekly aggregates, or use APPROX_COUNT_DISTINCT for exploratory questions",
+        })
+
+    if stage["shuffle_output_bytes_spilled"]:
+        flags.append({
+            "stage": stage["stage"],
+            "issue": "Shuffle spilled to disk",
+            "detail": f"{stage['shuffle_output_bytes_spilled']:,} bytes spilled",
+            "suggestion": "Reduce row width or row count before this stage",
+        })
+    return flags
+
+
+def profile_job(query_job) -> dict:
+    """
+    Stage-by-stage profile of a finished query job with problem flags.
+
+    The plan is only populated once the job has run; call after `result()`.
+    """
+    stages = []
+    flags = []
+    for entry in query_job.query_plan or []:
+        stage = _summarize_stage(entry)
+        stages.append(stage)
+        flags.extend(_diagnose_stage(entry, stage))
+
+    elapsed_ms = None
+    if query_job.started and query_job.ended:
+        elapsed_ms = int((query_job.ended - query_job.started).total_seconds() * 1000)
+
+    return {
+        "job_id": query_job.job_id,
+        "elapsed_ms": elapsed_ms,
+        "cache_hit": query_job.cache_hit,
+        "total_bytes_processed": query_job.total_bytes_processed,
+        "total_bytes_billed": query_job.total_bytes_billed,
+        "slot_millis": query_job.slot_millis,
+        "flags": flags,
+        "stages": stages,
+    }
@@ -6,7 +6,7 @@ Prompts - Pre-defined analysis workflows
 When users ask about specific topics, automatically run the appropriate phase(s):
 
 1. **Gameplay OKR / Quota Attainment** - User asks "what is the gameplay OKR?", "OKR?", "quota?", "gameplay OKR numbers?", etc.
-   → IMMEDIATELY run Phase 0 query (phase0_team_okr.sql) - DO NOT just explain the definition
+   → IMMEDIATELY run Phase 0 with `run_phase_script("phase0_team_okr")` (all 3 queries, one scan) - DO NOT just explain the definition
    → Execute the SQL and present ACTUAL NUMBERS:
      * Overall: X/Y games meeting quota (Z% meeting)
      * Tier breakdown table with performance by subscription tier
@@ -30,6 +30,20 @@ When users ask about specific topics, automatically run the appropriate phase(s)
      - Game-level detail: questers, bot %, quests available (week-over-week)
      - New game launches AND discontinued/churned games
 """
+import functools
+
+# Cost attribution: queries run for a prompt carry its name as a job label (see cost_report)
+CALLER_NOTE = ('Pass `caller="{prompt}"` to every query_bigquery call, and to every other tool '
+               'with a `caller` argument, for this analysis.')
+
+
+def _attributed(prompt_fn):
+    """Append the cost-attribution note naming this prompt to its text"""
+    @functools.wraps(prompt_fn)
+    def wrapper(*args, **kwargs):
+        return f"{prompt_fn(*args, **kwargs)}\n\n{CALLER_NOTE.format(prompt=prompt_fn.__name__)}"
+    return wrapper
+
 
 # Common filters used across all prompts
 COMMON_FILTERS = """- v.is_front_end_cohort = TRUE
@@ -47,12 +61,14 @@ def register(mcp):
     - questers_report - Full 4-phase weekly report (Phase 0 → 1 → 2 → 3)
     - metric_decomposition - WoW delta breakdown with driver attribution
     - investigate_game - Deep dive into specific game
+    - investigate_games - Deep dive into several games at once (one scan)
     - bot_analysis - Bot activity across all games
     - quest_completions_breakdown - Simple quest completions (no alerts)
     - quest_farming_analysis - Quest farming and reward rebalancing
     """
     
     @mcp.prompt()
+    @_attributed
     def questers_report() -> str:
         """
         Standard weekly gameplay questers report.
@@ -64,8 +80,13 @@ def register(mcp):
 {COMMON_FILTERS}
 - Only active subscriptions (active_subscription = TRUE)
 
+## Run Phases 0-2 in ONE call
+Call `run_questers_report()` first. It runs Phase 0, Phase 1 and Phase 2 on the
+server (in parallel where possible) and returns every number needed below.
+Only fall back to the individual queries if a stage appears in `errors`.
+
 ## Phase 0: Team OKR Snapshot
-Read `questers://sql/phase0_team_okr` and run query.
+If not already in the report, call `run_phase_script("phase0_team_okr")` (all 3 queries, one scan).
 Present: Overall (X/Y games meeting quota), Tier breakdown, Games below quota table.
 
 ────────────────────────────────────────────
@@ -75,7 +96,8 @@ Present: Overall (X/Y games meeting quota), Tier breakdown, Games below quota ta
 2. Per-game table: Game | Tier | AM | Curr | Prev | WoW | WoW% | Quests | Bot%
 
 ## Phase 2: Decomposition
-Classify games into buckets and present tree:
+Call `weekly_decomposition()` (last complete week vs the week before) and present the tree.
+Buckets:
 - **New Games**: prev=0, curr>0
 - **Discontinued/Off**: prev>0, curr=0 (or confirmed turned off)
 - **Continuing**: active both weeks
@@ -95,12 +117,16 @@ Then write 3-5 numbered PM narratives covering ecosystem health, biggest mover,
 Pause and ask: "Want quest-level audit with automated alerts? Or different angle?"
 
 **If yes:** Read `questers://sql/phase3_quest_alerts` and present by priority.
+**If it's for one AM:** call `get_am_digest(am=...)` instead (stored per-AM digest, no re-scan).
+**If the audit was reviewed before:** call `alerts_since(last_run=...)` and present only new,
+changed and resolved alerts.
 
 ## Phase 4: Investigate
 Based on user direction, run targeted follow-ups."""
 
 
     @mcp.prompt()
+    @_attributed
     def weekly_quester_report(weeks: int = 4) -> str:
         """
         Weekly trends report over multiple weeks.
@@ -110,6 +136,10 @@ Based on user direction, run targeted follow-ups."""
         """
         return f"""Generate weekly quester report for last {weeks} weeks.
 
+Call `weekly_trends(weeks={weeks})` for the trend matrix; it reads the frozen
+weekly aggregate store and only scans weeks not stored yet (or still settling). For the driver
+breakdown between any two of these weeks, call `weekly_decomposition(curr_week, prev_week)`.
+
 ## Output
 1. Weekly totals (gameplay questers across all games)
 2. Per-game table: Game | Week 1 | Week 2 | Week 3 | Week 4 | Trend | Reason
@@ -118,6 +148,7 @@ Based on user direction, run targeted follow-ups."""
 
 
     @mcp.prompt()
+    @_attributed
     def investigate_game(game_name: str) -> str:
         """
         Deep dive into a specific game's quester trends.
@@ -145,11 +176,50 @@ Stop and ask: "What's driving this? Possible angles:
 
 ## Phase 3: Investigate
 Run targeted queries based on user hypothesis. Report back and iterate.
+For quest lifecycle, call `quests_live(game_name="{game_name}")` and
+`quest_changes(game_name="{game_name}")` (quest validity dates, no event scan).
+For follow-ups over the last 30-90 days, prefer `query_local(sql=...)` over the local
+event mirror (`events` table, filters applied, bots labelled) - no BigQuery scan.
 
 **SQL Safety:** Use parameterized queries (WHERE g.game_name = @game_name)."""
 
 
     @mcp.prompt()
+    @_attributed
+    def investigate_games(game_names: str) -> str:
+        """
+        Deep dive into several games at once (e.g. an AM's whole portfolio).
+        
+        Args:
+            game_names: Comma-separated list of games to investigate
+        """
+        names = [name.strip() for name in game_names.split(",") if name.strip()]
+        return f"""Investigate gameplay questers for {len(names)} games: {', '.join(names)}.
+
+## Required Filters
+{COMMON_FILTERS}
+
+## Phase 1: Present Trends (ONE scan)
+Call `investigate_games(game_names={names})` - do NOT run one query per game.
+For each game show last 4 complete weeks:
+| Week | Questers | Bot % | Quests Available |
+
+List games with no activity separately.
+
+## Phase 2: ASK for Hypotheses (MANDATORY)
+Stop and ask which games and angles to dig into (quest-level breakdown,
+bot analysis, quest lifecycle, farming detection).
+
+**WAIT for user input.**
+
+## Phase 3: Investigate
+For quest-level detail across several games, call `quest_completions_batch(game_names=[...])`
+(one scan) instead of one breakdown per game. Further follow-ups over the last 30-90 days
+can run on the local event mirror with `query_local(sql=...)` (no BigQuery scan)."""
+
+
+    @mcp.prompt()
+    @_attributed
     def bot_analysis() -> str:
         """
         Analyze bot/sybil activity across active games.
@@ -168,6 +238,7 @@ Join mod_imx.sybil_score on user_id, where bot_score = 1."""
 
 
     @mcp.prompt()
+    @_attributed
     def quest_farming_analysis() -> str:
         """
         Identify over-farmed quests and under-incentivized real players.
@@ -185,6 +256,10 @@ Join mod_imx.sybil_score on user_id, where bot_score = 1."""
 
 2. Bot Efficiency: Compare bot vs human completions per user
 
+   Comp/User is a mean. For HIGH/MEDIUM quests, call `completion_distribution(days=7)`
+   (stored daily histograms, no event re-scan) and report p50 / p99 / top-1% share:
+   a high top-1% share with a modest mean means a few grinders, not broad farming.
+
 3. Under-Incentivized: Low bot%, low completions (real players not engaging)
 
 4. Rebalancing Recommendations based on patterns"""
@@ -193,6 +268,7 @@ Join mod_imx.sybil_score on user_id, where bot_score = 1."""
 
 
     @mcp.prompt()
+    @_attributed
     def quest_completions_breakdown(game_name: str = "") -> str:
         """
         Quest-level completions breakdown for active games (Phase 3).
@@ -201,10 +277,17 @@ Join mod_imx.sybil_score on user_id, where bot_score = 1."""
         This is a simpler view showing just completions without alert flags.
         
         Args:
-            game_name: Optional game to filter to. Leave empty for all active games.
+            game_name: Optional game to filter to (comma-separated for several games).
+                       Leave empty for all active games.
         """
+        game_names = [name.strip() for name in game_name.split(",") if name.strip()]
         game_filter = f'for **{game_name}**' if game_name else 'across **all active non-Maintenance games**'
-        game_note = f"Filter to g.game_name = @game_name (parameterized). Include bot % per quest." if game_name else "Show all games grouped, no bot % (too expensive)."
+        if len(game_names) > 1:
+            game_note = f"Call `quest_completions_batch(game_names={game_names})` - ONE scan for all games, with bot % per quest. Present one table per game."
+        elif game_name:
+            game_note = f"Filter to g.game_name = @game_name (parameterized). Include bot % per quest."
+        else:
+            game_note = "Show all games grouped, no bot % (too expensive)."
         
         return f"""**Note:** For comprehensive audit with alerts, use `questers://sql/phase3_quest_alerts`.
 
@@ -225,6 +308,7 @@ After presenting, ASK: "Any quests stand out? Want to dig deeper?" **WAIT for us
 
 
     @mcp.prompt()
+    @_attributed
     def compare_periods(start1: str, end1: str, start2: str, end2: str) -> str:
         """
         Compare quester activity between two time periods.
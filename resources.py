@@ -2,10 +2,17 @@
 Resources - Context for the AI to understand tables and definitions
 """
 from pathlib import Path
+import re
 
 # Get the directory containing this file
 _SCRIPT_DIR = Path(__file__).parent
 
+# Statement markers inside phase SQL files, e.g. "-- QUERY 2: Tier Breakdown"
+_QUERY_MARKER = re.compile(r"^-- QUERY (\d+): (.+)$")
+
+# CTE names in a shared WITH block, e.g. "quota_status AS ("
+_CTE_NAME = re.compile(r"^\s*(?:WITH\s+)?(\w+)\s+AS\s*\(", re.IGNORECASE | re.MULTILINE)
+
 
 def _load_sql(filename: str) -> str:
     """Load SQL content from a file"""
@@ -18,6 +25,107 @@ def _load_sql(filename: str) -> str:
     except Exception as e:
         raise RuntimeError(f"Failed to load SQL file {filename}: {e}")
 
+
+def _parse_phase_file(sql: str) -> tuple:
+    """Shared preamble lines (before the first marker) and {N: {"title", "body"}} of a phase file"""
+    preamble = []
+    queries = {}
+    current = None
+    for line in sql.splitlines():
+        match = _QUERY_MARKER.match(line.strip())
+        if match:
+            current = {"title": match.group(2).strip(), "lines": []}
+            queries[int(match.group(1))] = current
+            continue
+        if current is None:
+            if preamble or (line.strip() and not line.strip().startswith("--")):
+                preamble.append(line)
+            continue
+        if current.get("done"):
+            continue
+        current["lines"].append(line)
+        if line.rstrip().endswith(";"):
+            current["done"] = True
+
+    bodies = {
+        number: {"title": query["title"], "body": "\n".join(query["lines"]).strip().rstrip(";").strip()}
+        for number, query in queries.items()
+    }
+    return "\n".join(preamble).strip(), bodies
+
+
+def split_queries(sql: str) -> dict:
+    """
+    Split a phase SQL file into runnable statements keyed by query number.
+
+    Statements start at a "-- QUERY N: Title" marker and end at the first line
+    ending in ";". Any shared CTE block before the first marker (e.g. Phase 0's
+    WITH ... quota_status) is prefixed to every statement so each one runs on
+    its own. Files without markers (e.g. Phase 2) are one statement, titled
+    from their first comment line. Returns {N: {"title": ..., "sql": ...}}.
+    """
+    shared_cte, queries = _parse_phase_file(sql)
+    if not queries:
+        lines = sql.splitlines()
+        first_line = lines[0].strip() if lines else ""
+        title = first_line[2:].strip() if first_line.startswith("--") else ""
+        return {1: {"title": title, "sql": sql.strip().rstrip(";").strip()}}
+
+    return {
+        number: {
+            "title": query["title"],
+            "sql": f"{shared_cte}\n{query['body']}" if shared_cte else query["body"],
+        }
+        for number, query in queries.items()
+    }
+
+
+def build_script(sql: str):
+    """
+    A phase file with a shared CTE block as ONE multi-statement script.
+
+    Each shared CTE that the queries reference is materialized once into a
+    temp table (CREATE TEMP TABLE quota_status AS WITH ... SELECT * FROM
+    quota_status), then every query runs against it, so the underlying scan
+    happens once instead of once per query. Returns {"sql": script,
+    "queries": {N: title}}, or None when the file has no shared CTE block.
+    """
+    shared_cte, queries = _parse_phase_file(sql)
+    if not shared_cte or not queries:
+        return None
+
+    referenced = [
+        name for name in _CTE_NAME.findall(shared_cte)
+        if any(re.search(rf"\b{name}\b", query["body"]) for query in queries.values())
+    ]
+    statements = [f"CREATE TEMP TABLE {name} AS\n{shared_cte}\nSELECT * FROM {name};" for name in referenced]
+    statements += [f"-- QUERY {number}: {queries[number]['title']}\n{queries[number]['body']};" for number in sorted(queries)]
+    return {
+        "sql": "\n\n".join(statements),
+        "queries": {number: queries[number]["title"] for number in sorted(queries)},
+    }
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL without comments, case or whitespace differences, for recognising known statements"""
+    without_comments = re.sub(r"--[^\n]*", " ", sql)
+    return " ".join(without_comments.split()).rstrip(";").strip().lower()
+
+
+def identify_statement(sql: str):
+    """Key ("<phase file>#<N>") of a known phase statement, or None for ad-hoc SQL"""
+    return _STATEMENTS_BY_SQL.get(normalize_sql(sql))
+
+
+def _index_phase_statements(filenames: list) -> dict:
+    """Every statement of the phase files, keyed by <file stem>#<N>"""
+    statements = {}
+    for filename in filenames:
+        for number, query in split_queries(_load_sql(filename)).items():
+            statements[f"{Path(filename).stem}#{number}"] = {**query, "file": filename, "number": number}
+    return statements
+
+
 DEFINITIONS = """# Quester Definitions
 
 ## Questers (All Questers)
@@ -198,6 +306,13 @@ User asks: "What about questers WoW?" / "Weekly performance?" / "How did quester
   5. Discontinued/churned games (games that went from N to 0 questers or turned off)
   6. Key insights about quality (human vs bot growth)
 
+### 3. Exploratory / "Roughly" Questions
+User asks: "Roughly how did questers move?" / "Ballpark bot %?" / early exploration
+→ Run the phase query with `accuracy="approx"` (APPROX_COUNT_DISTINCT, ~±1%)
+  or `accuracy="sample"` (deterministic 10% visitor sample, counts scaled)
+→ Present the numbers WITH the returned error bound
+→ Offer the exact version; only run `accuracy="exact"` if the user confirms
+
 ## Standard Output Format
 When asked about questers, always provide:
 
@@ -486,6 +601,7 @@ Use this after Phase 2 (decomposition) when the user wants quest-level granulari
 See `phase3_quest_completions.sql` for complete SQL queries including:
 - All Active Games - Quest Completions (Last 3 Days)
 - Specific Game with Bot % Breakdown (Last 3 Days)
+- Multiple Games with Bot % Breakdown (Last 3 Days, one scan via @game_names)
 
 ## Presentation Format
 
@@ -574,6 +690,39 @@ PHASE0_TEAM_OKR = _get_phase0_team_okr_content()
 PHASE1_WEEKLY_TRENDS_SQL = _get_phase1_weekly_trends_content()
 PHASE2_DECOMPOSITION_SQL = _get_phase2_decomposition_content()
 PHASE3_QUEST_COMPLETIONS_SQL = _get_phase3_quest_completions_content()
+WEEKLY_AGGREGATES_SQL = _load_sql('weekly_aggregates.sql')
+COMPLETION_HISTOGRAMS_SQL = _load_sql('completion_histograms.sql')
+JOB_COSTS_SQL = _load_sql('job_costs.sql')
+EVENT_MIRROR_QUERIES = split_queries(_load_sql('event_mirror.sql'))
+
+# Individually runnable statements from the multi-query phase files
+PHASE0_QUERIES = split_queries(_load_sql('phase0_team_okr.sql'))
+PHASE1_QUERIES = split_queries(PHASE1_WEEKLY_TRENDS_SQL)
+PHASE3_COMPLETIONS_QUERIES = split_queries(PHASE3_QUEST_COMPLETIONS_SQL)
+DIMENSION_QUERIES = split_queries(_load_sql('dimensions.sql'))
+PHASE3_QUEST_ALERTS_SQL = _load_sql('phase3_quest_alerts.sql')
+
+# Known statements, so the server can tell which step of a workflow has run
+# (and label jobs by phase file and statement for cost attribution)
+PHASE_STATEMENTS = _index_phase_statements([
+    'phase0_team_okr.sql',
+    'phase1_weekly_trends.sql',
+    'phase2_decomposition.sql',
+    'phase3_quest_completions.sql',
+    'phase3_quest_alerts.sql',
+    'weekly_aggregates.sql',
+    'completion_histograms.sql',
+    'dimensions.sql',
+    'event_mirror.sql',
+])
+_STATEMENTS_BY_SQL = {normalize_sql(query["sql"]): key for key, query in PHASE_STATEMENTS.items()}
+
+# Phase files with a shared CTE block, runnable as one script (shared CTE materialized once)
+PHASE_SCRIPTS = {
+    key.split("#")[0]: script
+    for key, query in PHASE_STATEMENTS.items()
+    if query["number"] == 1 and (script := build_script(_load_sql(query["file"])))
+}
 
 
 def _get_quest_alerts_enhanced_content() -> str:
@@ -0,0 +1,81 @@
+"""
+Results - In-memory result store shared by queries and prefetches
+
+Rows are keyed by normalized SQL + parameters and kept for RESULT_TTL_SECONDS
+(phase queries are relative to CURRENT_DATE, so results go stale). A query
+that is still running in the background (e.g. a prefetch) is tracked as a
+pending future, so a follow-up request waits for it instead of re-running it.
+
+Expired rows are purged on every write, and at most RESULT_MAX_ENTRIES are
+kept (oldest evicted first), so a long-running shared server stays bounded.
+"""
+import json
+import threading
+import time
+
+from resources import normalize_sql
+
+RESULT_TTL_SECONDS = 900  # 15 minutes
+RESULT_MAX_ENTRIES = 256
+
+_lock = threading.Lock()
+_results = {}  # key -> (stored_at, rows)
+_pending = {}  # key -> concurrent.futures.Future
+
+
+def cache_key(sql: str, parameters: dict = None) -> str:
+    """Store key for a statement and its parameters"""
+    return json.dumps([normalize_sql(sql), parameters or {}], sort_keys=True, default=str)
+
+
+def get(key: str):
+    """Stored rows for a key, or None if missing or expired"""
+    with _lock:
+        entry = _results.get(key)
+        if entry is None:
+            return None
+        stored_at, rows = entry
+        if time.time() - stored_at > RESULT_TTL_SECONDS:
+            del _results[key]
+            return None
+        return rows
+
+
+def put(key: str, rows: list) -> None:
+    """Store rows for a key, purging expired entries and evicting the oldest beyond RESULT_MAX_ENTRIES"""
+    now = time.time()
+    with _lock:
+        for expired in [k for k, (stored_at, _) in _results.items() if now - stored_at > RESULT_TTL_SECONDS]:
+            del _results[expired]
+        _results.pop(key, None)  # re-insert so insertion order stays oldest-first
+        _results[key] = (now, rows)
+        while len(_results) > RESULT_MAX_ENTRIES:
+            del _results[next(iter(_results))]
+
+
+def pending(key: str):
+    """Future of a query for this key that is still running, if any"""
+    with _lock:
+        return _pending.get(key)
+
+
+def track(key: str, future) -> bool:
+    """
+    Register a background query for a key; its rows are stored when it finishes.
+
+    Returns False (and does not track) if the key is already stored or pending.
+    """
+    with _lock:
+        stored = _results.get(key)
+        if key in _pending or (stored and time.time() - stored[0] <= RESULT_TTL_SECONDS):
+            return False
+        _pending[key] = future
+
+    def _done(finished):
+        with _lock:
+            _pending.pop(key, None)
+        if not finished.cancelled() and finished.exception() is None:
+            put(key, finished.result())
+
+    future.add_done_callback(_done)
+    return True
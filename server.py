@@ -7,8 +7,24 @@ Structure:
 - server.py    : Entry point (this file)
 - resources.py : Context for AI (definitions, tables, analysis guide)
 - prompts.py   : Pre-defined analysis workflows
-- tools.py     : Actions (query_bigquery)
+- tools.py     : Actions (query_bigquery, explain_query)
+- profiling.py : Query-plan diagnostics for slow queries
+- aggregates.py: Frozen weekly aggregates for Phase 1/2 (weekly_decomposition, weekly_trends)
+- batch.py     : Multi-game investigation in a single scan
+- dimensions.py: Cached game/quest index and game_id pushdown (game_info)
+- pipeline.py  : Server-side Phase 0-2 report as a dependency graph (run_questers_report)
+- distributions.py: Completions-per-user histograms for farming detection (completion_distribution)
+- digests.py   : Per-AM Phase 3 alert digests from one scan (get_am_digest)
+- lifecycle.py : Quest lifecycle from validity intervals (quests_live, quest_changes)
+- costs.py     : Job cost attribution by phase, statement and caller (cost_report)
+- alerts.py    : Phase 3 alert snapshots and delta alerting (alerts_since)
+- mirror.py    : Local Parquet mirror of filtered events (mirror_sync, query_local)
+- jobs.py      : Per-session job tracking and cancellation (cancel_query, collect_query)
+
+Set QUESTERS_TRANSPORT=sse to share one server across clients (see loadtest.py).
 """
+import os
+
 from fastmcp import FastMCP
 
 # Initialize MCP server
@@ -18,11 +34,37 @@ mcp = FastMCP("Questers Tracker")
 import resources
 import prompts
 import tools
+import aggregates
+import batch
+import dimensions
+import pipeline
+import distributions
+import digests
+import lifecycle
+import costs
+import alerts
+import mirror
+import jobs
 
 resources.register(mcp)
 prompts.register(mcp)
 tools.register(mcp)
+aggregates.register(mcp)
+batch.register(mcp)
+dimensions.register(mcp)
+pipeline.register(mcp)
+distributions.register(mcp)
+digests.register(mcp)
+lifecycle.register(mcp)
+costs.register(mcp)
+alerts.register(mcp)
+mirror.register(mcp)
+jobs.register(mcp)
 
 
 if __name__ == "__main__":
-    mcp.run()
+    # Per-connection sessions: cancel a client's still-running BigQuery jobs when it disconnects
+    jobs.install_cleanup(mcp)
+
+    # stdio for a single client (default); sse to share one server across clients
+    mcp.run(transport=os.environ.get("QUESTERS_TRANSPORT", "stdio"))
@@ -0,0 +1,137 @@
+"""
+Store - Local Parquet storage for precomputed results
+
+Each table is a directory of Parquet partitions:
+    <DATA_DIR>/<table>/<partition>.parquet
+
+Set QUESTERS_DATA_DIR to move the store (defaults to ./data next to this file).
+
+Tables partitioned by period (day or week) share the helpers at the end:
+the complete periods to cover, whether a stored period can be reused (see
+is_current), and the contiguous ranges of missing ones to scan in one query
+each.
+"""
+import datetime
+import os
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_DIR = Path(os.environ.get("QUESTERS_DATA_DIR", Path(__file__).parent / "data"))
+
+SETTLE_DAYS = 7  # late events and sybil score updates land for up to a week after a period ends
+UNSETTLED_MAX_AGE = datetime.timedelta(minutes=15)  # reuse of a period written before it settled
+
+
+def _partition_path(table: str, key: str) -> Path:
+    """Path of a single partition file"""
+    return DATA_DIR / table / f"{key}.parquet"
+
+
+def list_partitions(table: str) -> list:
+    """Sorted partition keys currently stored for a table"""
+    table_dir = DATA_DIR / table
+    if not table_dir.exists():
+        return []
+    return sorted(path.stem for path in table_dir.glob("*.parquet"))
+
+
+def has_partition(table: str, key: str) -> bool:
+    """Whether a partition has already been written"""
+    return _partition_path(table, key).exists()
+
+
+def partition_updated_at(table: str, key: str):
+    """UTC time a partition was last written, or None if missing"""
+    path = _partition_path(table, key)
+    if not path.exists():
+        return None
+    return datetime.datetime.fromtimestamp(path.stat().st_mtime, tz=datetime.timezone.utc)
+
+
+def write_partition(table: str, key: str, rows: list, schema: pa.Schema) -> None:
+    """
+    Write one partition atomically (temp file, then rename).
+
+    Empty row lists are still written so that "scanned, nothing found" is
+    distinguishable from "never scanned".
+    """
+    write_table(table, key, pa.Table.from_pylist(rows, schema=schema))
+
+
+def write_table(table: str, key: str, data: pa.Table) -> None:
+    """
+    Write a pyarrow Table as one partition atomically (temp file, then rename).
+
+    Each write gets its own temp file, so concurrent writers of the same
+    partition never interleave; the last rename wins.
+    """
+    path = _partition_path(table, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{key}.", suffix=".tmp", delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+    try:
+        pq.write_table(data, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def delete_partition(table: str, key: str) -> None:
+    """Remove a partition if it exists"""
+    _partition_path(table, key).unlink(missing_ok=True)
+
+
+def read_partition(table: str, key: str) -> list:
+    """Read one partition as a list of dicts (empty if missing)"""
+    data = read_table(table, key)
+    return data.to_pylist() if data is not None else []
+
+
+def read_table(table: str, key: str):
+    """Read one partition memory-mapped as a pyarrow Table (None if missing)"""
+    path = _partition_path(table, key)
+    if not path.exists():
+        return None
+    return pq.read_table(path, memory_map=True)
+
+
+def complete_days(n: int, today: datetime.date = None) -> list:
+    """Last `n` complete days (UTC), most recent first (excludes today)"""
+    today = today or datetime.datetime.utcnow().date()
+    return [today - datetime.timedelta(days=i) for i in range(1, n + 1)]
+
+
+def is_current(table: str, key: str, end: datetime.date) -> bool:
+    """
+    Whether a stored period partition (ending before `end`) can be reused.
+
+    A period keeps changing for SETTLE_DAYS after it ends. A partition
+    written after that is final; one written earlier is only reused for
+    UNSETTLED_MAX_AGE (so one report's stages share a scan), then rescanned.
+    """
+    updated_at = partition_updated_at(table, key)
+    if updated_at is None:
+        return False
+    if updated_at.date() >= end + datetime.timedelta(days=SETTLE_DAYS):
+        return True
+    return datetime.datetime.now(datetime.timezone.utc) - updated_at < UNSETTLED_MAX_AGE
+
+
+def contiguous_runs(periods: list, step: datetime.timedelta, max_periods: int = None) -> list:
+    """
+    Group sorted period starts into (start, end_exclusive) ranges so gaps are not rescanned.
+
+    `step` is the period length (a day or a week); `max_periods` caps the
+    length of one range.
+    """
+    runs = []
+    for period in periods:
+        if runs and runs[-1][1] == period and (max_periods is None or (period - runs[-1][0]) < step * max_periods):
+            runs[-1][1] = period + step
+        else:
+            runs.append([period, period + step])
+    return [tuple(run) for run in runs]
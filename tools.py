@@ -2,10 +2,200 @@
 Tools - Actions the AI can perform
 """
 from google.cloud import bigquery
+import concurrent.futures
+import datetime
 import json
+import os
+import re
 
-# Initialize BigQuery client
-bq_client = bigquery.Client()
+import approximate
+import costs
+import dimensions
+import jobs
+import prefetch
+import results
+from profiling import profile_job
+from resources import PHASE_SCRIPTS, identify_statement
+
+# Initialize BigQuery client (simulated warehouse for load tests, see loadtest.py)
+if os.environ.get("QUESTERS_FAKE_BIGQUERY"):
+    import fake_bigquery
+    bq_client = fake_bigquery.Client()
+else:
+    bq_client = bigquery.Client()
+
+# Safety limits applied to every query this server submits
+MAX_BYTES_BILLED = 10_000_000_000  # 10 GB limit to prevent runaway costs
+QUERY_TIMEOUT = 300  # 5 minute timeout
+
+
+def check_event_filter(sql: str):
+    """Return an error message if the event table is queried without an event_ts filter"""
+    sql_lower = sql.lower()
+    if 'app_immutable_play.event' in sql_lower or 'event e' in sql_lower:
+        if 'event_ts' not in sql_lower:
+            return ("Query includes event table but no event_ts filter. "
+                    "Always filter on event_ts to avoid costly queries. "
+                    "Example: WHERE e.event_ts >= TIMESTAMP(DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY))")
+    return None
+
+
+def _infer_param_type(value) -> str:
+    """Infer a BigQuery scalar type from a Python value"""
+    if isinstance(value, bool):
+        return "BOOL"
+    elif isinstance(value, int):
+        return "INT64"
+    elif isinstance(value, float):
+        return "FLOAT64"
+    elif isinstance(value, datetime.datetime):
+        return "TIMESTAMP"
+    elif isinstance(value, datetime.date):
+        return "DATE"
+    return "STRING"
+
+
+def build_query_parameters(parameters: dict) -> list:
+    """
+    Build BigQuery query parameters, inferring each type from its Python type.
+
+    Lists become ARRAY parameters typed from their first element (empty lists
+    are ARRAY<STRING>), for use with `IN UNNEST(@param)`.
+    """
+    query_parameters = []
+    for param_name, param_value in parameters.items():
+        if isinstance(param_value, (list, tuple)):
+            element_type = _infer_param_type(param_value[0]) if param_value else "STRING"
+            query_parameters.append(
+                bigquery.ArrayQueryParameter(param_name, element_type, list(param_value))
+            )
+        else:
+            query_parameters.append(
+                bigquery.ScalarQueryParameter(param_name, _infer_param_type(param_value), param_value)
+            )
+    return query_parameters
+
+
+def row_to_dict(row) -> dict:
+    """Convert a BigQuery row to a JSON-friendly dict"""
+    row_dict = {}
+    for key, value in row.items():
+        if hasattr(value, 'isoformat'):
+            row_dict[key] = value.isoformat()
+        else:
+            row_dict[key] = value
+    return row_dict
+
+
+def _label_value(value) -> str:
+    """BigQuery label value: lowercase letters, digits, _ and -, at most 63 characters"""
+    return re.sub(r"[^a-z0-9_-]", "-", str(value).lower())[:63]
+
+
+def job_labels(sql: str, caller: str = None, statement: str = None) -> dict:
+    """
+    Cost-attribution labels for a job.
+
+    phase and statement come from the known statement (identified from the
+    SQL unless given, e.g. "phase1_weekly_trends#2"); caller is the
+    originating prompt or server component.
+    """
+    labels = {"app": "questers", "session": jobs.current_session()}
+    statement = statement or identify_statement(sql)
+    if statement:
+        labels["phase"] = statement.split("#")[0]
+        labels["statement"] = statement
+    if caller:
+        labels["caller"] = caller
+    return {key: _label_value(value) for key, value in labels.items()}
+
+
+def submit_query(sql: str, parameters: dict = None, priority: str = None,
+                 maximum_bytes_billed: int = MAX_BYTES_BILLED, dry_run: bool = False,
+                 caller: str = None, statement: str = None):
+    """
+    Submit a query with the standard safety limits and return the QueryJob.
+
+    priority="BATCH" queues the job behind interactive queries (used for
+    prefetching); dry_run=True only estimates bytes processed. The job is
+    labelled for cost attribution (see job_labels).
+    """
+    job_config = bigquery.QueryJobConfig(maximum_bytes_billed=maximum_bytes_billed, dry_run=dry_run)
+    job_config.labels = job_labels(sql, caller, statement)
+    if priority:
+        job_config.priority = priority
+    if parameters:
+        job_config.query_parameters = build_query_parameters(parameters)
+
+    query_job = bq_client.query(sql, job_config=job_config)
+    if not dry_run:
+        jobs.track(query_job)
+    return query_job
+
+
+def _wait_for(query_job):
+    """
+    Wait for a job and return its RowIterator.
+
+    A job that outlives QUERY_TIMEOUT stays tracked (see jobs.py) so its
+    rows can still be collected; the timeout error is re-raised.
+    """
+    try:
+        results = query_job.result(timeout=QUERY_TIMEOUT)
+    except (TimeoutError, concurrent.futures.TimeoutError):
+        raise
+    except Exception:
+        jobs.forget(query_job.job_id)
+        raise
+    jobs.forget(query_job.job_id)
+    costs.log_job(query_job)
+    return results
+
+
+def fetch_rows(query_job) -> list:
+    """Wait for a job and return its rows as dicts"""
+    return [row_to_dict(row) for row in _wait_for(query_job)]
+
+
+def fetch_arrow(query_job):
+    """Wait for a job and return its rows as a pyarrow Table (for bulk exports)"""
+    return _wait_for(query_job).to_arrow()
+
+
+def script_results(parent) -> list:
+    """
+    Wait for a script job and return each SELECT's rows, in script order.
+
+    Result sets are collected from the script's child jobs, so statements
+    sharing a temp table need only one submission.
+    """
+    fetch_rows(parent)
+    children = [job for job in bq_client.list_jobs(parent_job=parent.job_id) if job.statement_type == "SELECT"]
+    children.sort(key=lambda job: job.created)
+    # Child jobs are already finished, and their cost is counted on the parent
+    return [[row_to_dict(row) for row in child.result(timeout=QUERY_TIMEOUT)] for child in children]
+
+
+def run_script(sql: str, parameters: dict = None, caller: str = None, statement: str = None) -> list:
+    """Run a multi-statement script as one job and return each SELECT's rows, in script order"""
+    return script_results(submit_query(sql, parameters, caller=caller, statement=statement))
+
+
+def phase_results(phase: str, result_sets: list) -> list:
+    """Label a phase script's result sets with their query numbers and titles"""
+    return [
+        {"query": number, "title": title, "rows": rows}
+        for (number, title), rows in zip(PHASE_SCRIPTS[phase]["queries"].items(), result_sets)
+    ]
+
+
+def run_query(sql: str, parameters: dict = None, caller: str = None, statement: str = None) -> list:
+    """
+    Execute a query with the standard safety limits and return rows as dicts.
+
+    Raises on failure; callers decide how to surface the error.
+    """
+    return fetch_rows(submit_query(sql, parameters, caller=caller, statement=statement))
 
 
 def register(mcp):
@@ -14,10 +204,13 @@ def register(mcp):
     
     Tools registered:
     - query_bigquery: Execute SQL queries against BigQuery with safety checks and parameter support
+    - explain_query: Run a query and return its stage-by-stage execution profile
+    - run_phase_script: Run every query of a phase file as one script (shared CTE computed once)
     """
     
     @mcp.tool()
-    def query_bigquery(sql: str, parameters: dict = None) -> str:
+    def query_bigquery(sql: str, parameters: dict = None, profile: bool = False, accuracy: str = "exact",
+                       replaces: str = "", caller: str = "") -> str:
         """
         Execute a SQL query against BigQuery with optional parameters.
         
@@ -28,9 +221,27 @@ def register(mcp):
             sql: The SQL query to execute (use @param_name for parameters)
             parameters: Optional dict of parameters for parameterized queries
                        Example: {"game_name": "MetalCore", "days": 7}
+                       Lists become ARRAY parameters: {"game_names": ["MetalCore", "Cross The Ages"]}
+                       with `g.game_name IN UNNEST(@game_names)`
+            profile: If True, return {"rows": [...], "profile": {...}} with
+                     stage timings, skew and known-problem flags
+            accuracy: "exact" (default), "approx" (APPROX_COUNT_DISTINCT) or
+                      "sample" (deterministic 10% visitor sample, counts scaled).
+                      Use approx/sample for exploratory "roughly how..." questions;
+                      the response includes the error bound. Run exact only
+                      after the user confirms. sample only works for the Phase 1,
+                      Phase 2 and Phase 3 completion statements, unchanged;
+                      quest counts come out low under sampling.
+            replaces: Optional job id of an earlier query this one replaces;
+                      it is cancelled if still running. Re-running the same
+                      phase statement with new parameters does this automatically.
+            caller: Name of the prompt this query is for (e.g. "questers_report",
+                    "bot_analysis"); recorded as a job label for cost_report.
         
         Returns:
-            JSON string with query results
+            JSON string with query results. If the query outlives the 5 minute
+            timeout it keeps running: {"status": "running", "job_id": ...};
+            fetch the rows later with collect_query(job_id) (don't re-run it).
         
         Examples:
             # Without parameters
@@ -43,53 +254,142 @@ def register(mcp):
             )
         """
         # Warn if querying event table without time filter
-        sql_lower = sql.lower()
-        if 'app_immutable_play.event' in sql_lower or 'event e' in sql_lower:
-            if 'event_ts' not in sql_lower:
-                return json.dumps({
-                    "error": "Query includes event table but no event_ts filter. "
-                             "Always filter on event_ts to avoid costly queries. "
-                             "Example: WHERE e.event_ts >= TIMESTAMP(DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY))"
-                }, indent=2)
+        error = check_event_filter(sql)
+        if error:
+            return json.dumps({"error": error}, indent=2)
         
+        query_job = None
         try:
-            # Configure query with safety limits
-            job_config = bigquery.QueryJobConfig(
-                maximum_bytes_billed=10_000_000_000  # 10 GB limit to prevent runaway costs
-            )
-            
-            # Add query parameters if provided
-            if parameters:
-                query_parameters = []
-                for param_name, param_value in parameters.items():
-                    # Infer parameter type from Python type
-                    if isinstance(param_value, bool):
-                        param_type = "BOOL"
-                    elif isinstance(param_value, int):
-                        param_type = "INT64"
-                    elif isinstance(param_value, float):
-                        param_type = "FLOAT64"
-                    else:
-                        param_type = "STRING"
-                    
-                    query_parameters.append(
-                        bigquery.ScalarQueryParameter(param_name, param_type, param_value)
-                    )
-                job_config.query_parameters = query_parameters
-            
-            # Execute query with timeout
-            query_job = bq_client.query(sql, job_config=job_config)
-            results = query_job.result(timeout=300)  # 5 minute timeout
-            
-            rows = []
-            for row in results:
-                row_dict = {}
-                for key, value in row.items():
-                    if hasattr(value, 'isoformat'):
-                        row_dict[key] = value.isoformat()
-                    else:
-                        row_dict[key] = value
-                rows.append(row_dict)
+            if replaces:
+                try:
+                    jobs.cancel(replaces)
+                except ValueError:
+                    pass  # already collected, or not this session's job
+
+            use_store = accuracy == "exact" and not profile
+
+            # Start likely follow-ups (e.g. Phase 2 after Phase 1) in the background. Only for
+            # exact requests: approx/sample answers must not trigger exact scans unconfirmed
+            if use_store:
+                prefetch.on_submit(sql, parameters)
+
+            # Serve exact results from the result store (including finished or running prefetches)
+            key = results.cache_key(sql, parameters)
+            if use_store:
+                rows = results.get(key)
+                # A prefetch of this query is only waited for once its job runs (see prefetch.claim)
+                future = prefetch.claim(key) if rows is None else None
+                if future is not None:
+                    query_job = jobs.uncollected(key)
+                    try:
+                        rows = future.result(timeout=QUERY_TIMEOUT)
+                    except Exception:
+                        if not future.done():
+                            raise  # still running: return its job id
+                        rows = None  # prefetch failed or timed out: its job, if any, is reused below
+                if rows is not None:
+                    return json.dumps(rows, indent=2, default=str)
+
+            # Same query timed out earlier: use its job (running or finished) instead of re-running
+            query_job = jobs.uncollected(key) if use_store else None
+            statement = identify_statement(sql)
+            if query_job is None:
+                # Resolve game names to ids so the filter also applies to the event scan
+                sql, parameters = dimensions.pushdown(sql, parameters)
+                query_job = submit_query(approximate.rewrite(sql, accuracy, statement), parameters,
+                                         caller=caller or None, statement=statement)
+                # Only exact jobs are reusable under the result-store key: an approx or sample
+                # job's rows must never be collected or stored as the exact answer
+                jobs.track(query_job, key=key if use_store else None, statement=statement, accuracy=accuracy)
+                jobs.supersede(statement, query_job.job_id)
+            rows = fetch_rows(query_job)
+            if use_store:
+                results.put(key, rows)
+            if accuracy != "exact":
+                result = approximate.annotate(rows, accuracy, statement)
+                if profile:
+                    result["profile"] = profile_job(query_job)
+                return json.dumps(result, indent=2, default=str)
+            if profile:
+                return json.dumps({"rows": rows, "profile": profile_job(query_job)}, indent=2, default=str)
             return json.dumps(rows, indent=2, default=str)
+        except (TimeoutError, concurrent.futures.TimeoutError) as e:
+            if query_job is None:
+                return json.dumps({"error": str(e)}, indent=2)
+            return json.dumps({
+                "status": "running",
+                "job_id": query_job.job_id,
+                "message": (f"Query still running after {QUERY_TIMEOUT}s. Collect the rows with "
+                            "collect_query(job_id) or stop it with cancel_query(job_id)."),
+            }, indent=2)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
+
+    @mcp.tool()
+    def explain_query(sql: str, parameters: dict = None) -> str:
+        """
+        Run a query and return BigQuery's execution profile instead of its rows.
+        
+        Use when a phase query is slow to see where the time goes. The query
+        really executes (BigQuery only produces a plan for finished jobs), so
+        the usual event_ts filter and 10 GB limit apply.
+        
+        Args:
+            sql: The SQL query to profile (use @param_name for parameters)
+            parameters: Optional dict of parameters for parameterized queries
+        
+        Returns:
+            JSON with job totals (bytes, slot-ms, elapsed), per-stage timings,
+            input/output rows, wait/compute skew, and flags for UNNEST row
+            explosion, join skew on game_id and large COUNT(DISTINCT) stages
+        """
+        error = check_event_filter(sql)
+        if error:
+            return json.dumps({"error": error}, indent=2)
+        
+        try:
+            sql, parameters = dimensions.pushdown(sql, parameters)
+            query_job = submit_query(sql, parameters, caller="explain_query")
+            results = _wait_for(query_job)
+            return json.dumps({"row_count": results.total_rows, **profile_job(query_job)}, indent=2, default=str)
+        except Exception as e:
+            return json.dumps({"error": str(e)}, indent=2)
+
+    @mcp.tool()
+    def run_phase_script(phase: str = "phase0_team_okr") -> str:
+        """
+        Run ALL queries of a phase file as one BigQuery script and return every result set.
+        
+        The shared CTE block (e.g. Phase 0's 30-day quota_status) is
+        materialized once into a temp table and each query reads from it, so
+        the event scan runs once instead of once per query. Use this for
+        Phase 0 instead of running its queries separately.
+        
+        Args:
+            phase: Phase file name without .sql (default: "phase0_team_okr")
+        
+        Returns:
+            JSON with one entry per query: {"query": N, "title": ..., "rows": [...]}.
+            If the script outlives the 5 minute timeout it keeps running:
+            {"status": "running", "job_id": ...}; fetch the result sets later
+            with collect_query(job_id) (don't re-run it).
+        """
+        parent = None
+        try:
+            if phase not in PHASE_SCRIPTS:
+                return json.dumps({"error": f"No script for '{phase}'. Available: {', '.join(sorted(PHASE_SCRIPTS))}"}, indent=2)
+            statement = f"{phase}#script"
+            parent = submit_query(PHASE_SCRIPTS[phase]["sql"], caller="run_phase_script", statement=statement)
+            jobs.track(parent, statement=statement, script=phase)
+            return json.dumps(phase_results(phase, script_results(parent)), indent=2, default=str)
+        except (TimeoutError, concurrent.futures.TimeoutError) as e:
+            if parent is None:
+                return json.dumps({"error": str(e)}, indent=2)
+            return json.dumps({
+                "status": "running",
+                "job_id": parent.job_id,
+                "message": (f"Script still running after {QUERY_TIMEOUT}s. Collect the result sets with "
+                            "collect_query(job_id) or stop it with cancel_query(job_id)."),
+            }, indent=2)
         except Exception as e:
             return json.dumps({"error": str(e)}, indent=2)
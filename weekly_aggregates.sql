@@ -0,0 +1,37 @@
+-- Weekly Aggregates: Frozen per-(week, game) gameplay quester counts
+-- Feeds the local aggregate store (aggregates.py) used for Phase 1 trends and Phase 2 decomposition
+-- Only weeks missing from the store are scanned: @start_date (Monday, inclusive) to @end_date (Monday, exclusive)
+--
+-- One scan produces two grouping levels:
+-- - (week, game): per-game total / human / bot questers and quests available
+-- - (week): overall distinct questers across all games (game_name IS NULL)
+-- Per-game totals must never be summed for the overall number (multi-game users)
+
+SELECT 
+  DATE_TRUNC(DATE(e.event_ts), WEEK(MONDAY)) as week_start,
+  g.game_name,
+  g.plan_name as tier,
+  g.account_manager_name as am,
+  COUNT(DISTINCT e.visitor_id) as total_users,
+  COUNT(DISTINCT CASE WHEN s.bot_score IS NULL OR s.bot_score < 1 THEN e.visitor_id END) as human_users,
+  COUNT(DISTINCT CASE WHEN s.bot_score = 1 THEN e.visitor_id END) as bot_users,
+  COUNT(DISTINCT q.quest_id) as quest_count
+FROM `app_immutable_play.event` e
+INNER JOIN `app_immutable_play.visitor` v ON e.visitor_id = v.visitor_id
+LEFT JOIN `app_immutable_play.quest` q ON e.quest_id = q.quest_id
+LEFT JOIN `app_immutable_play.game` g ON q.game_id = g.game_id
+LEFT JOIN UNNEST(q.quest_category) AS category
+LEFT JOIN `mod_imx.sybil_score` s ON v.user_id = s.user_id
+WHERE 
+  e.event_ts >= TIMESTAMP(@start_date)
+  AND e.event_ts < TIMESTAMP(@end_date)
+  AND v.is_front_end_cohort = TRUE
+  AND (v.is_immutable_employee = FALSE OR v.is_immutable_employee IS NULL)
+  AND g.game_name NOT IN ('Guild of Guardians', 'Gods Unchained')
+  AND g.plan_name != 'Maintenance'
+  AND category LIKE '%gameplay%'
+GROUP BY GROUPING SETS (
+  (week_start, g.game_name, g.plan_name, g.account_manager_name),
+  (week_start)
+)
+ORDER BY week_start, total_users DESC;